@@ -1,5 +1,9 @@
 from . import peak_load_analysis_tool
 from . import gfunction
+from . import gfunction_cache
+from . import gfunction_library
+from . import gfunction_surrogate
+from . import load_aggregation
 from . import ground_heat_exchangers
 from . import coordinates
 from . import utilities
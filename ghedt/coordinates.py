@@ -1,5 +1,7 @@
 # Jack C. Cook
 # Tuesday, October 26, 2021
+import numpy as np
+from scipy.spatial import cKDTree
 
 
 def transpose_coordinates(coordinates):
@@ -126,6 +128,59 @@ def zoned_rectangle(Nx, Ny, Bx, By, Nix, Niy):
     return zoned
 
 
+def symmetry_groups(coordinates, tol=1.0e-6):
+    # Group the boreholes that are images of each other under the symmetries
+    # of the field: the mirrors about the x and y axes and the diagonals
+    # through the center of the field, and the rotations about its center.
+    # The group number of each borehole is returned, where the groups are
+    # numbered in the order they first appear. Boreholes in the same group
+    # have the same thermal response in a field of identical boreholes.
+    xy = np.array(coordinates, dtype=np.double).reshape(-1, 2)
+    nbh = xy.shape[0]
+    dxy = xy - xy.mean(axis=0)
+    # The distance under which two locations are the same
+    dis_tol = tol * max(float(np.abs(dxy).max()), 1.)
+
+    transformations = [
+        np.array([[-1., 0.], [0., 1.]]),  # mirror about the y axis
+        np.array([[1., 0.], [0., -1.]]),  # mirror about the x axis
+        np.array([[0., 1.], [1., 0.]]),  # mirror about the diagonal
+        np.array([[0., -1.], [-1., 0.]]),  # mirror about the other diagonal
+        np.array([[-1., 0.], [0., -1.]]),  # rotation by 180 degrees
+        np.array([[0., -1.], [1., 0.]]),  # rotation by 90 degrees
+    ]
+
+    # The groups are the connected sets of boreholes that the symmetries of
+    # the field map onto each other (a union-find of the boreholes)
+    parent = list(range(nbh))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    tree = cKDTree(dxy)
+    for transformation in transformations:
+        distances, images = tree.query(dxy @ transformation.T)
+        # The transformation is only a symmetry of the field if every
+        # borehole is mapped onto a borehole
+        if not np.all(distances < dis_tol):
+            continue
+        for i, j in enumerate(images):
+            parent[find(i)] = find(int(j))
+
+    group_numbers = {}
+    groups = []
+    for i in range(nbh):
+        root = find(i)
+        if root not in group_numbers:
+            group_numbers[root] = len(group_numbers)
+        groups.append(group_numbers[root])
+
+    return groups
+
+
 def visualize_coordinates(coordinates):
     """
     Visualize the (x,y) coordinates.
@@ -17,7 +17,9 @@ class Design:
                  sim_params: plat.media.SimulationParameters,
                  geometric_constraints: dt.media.GeometricConstraints,
                  hourly_extraction_ground_loads: list, method: str = 'hybrid',
-                 routine: str = 'near-square', flow: str = 'borehole'):
+                 routine: str = 'near-square', flow: str = 'borehole',
+                 cache=None, library=None, fidelity: str = 'high',
+                 surrogate=None):
         self.V_flow = V_flow  # volumetric flow rate, m3/s
         self.borehole = borehole
         self.bhe_object = bhe_object  # a borehole heat exchanger object
@@ -81,6 +83,19 @@ class Design:
                              'The currently available routines are: '
                              '`near-square`.')
         self.flow = flow
+        # An optional ghedt.gfunction_cache.GFunctionCache for the g-functions
+        # computed during the search
+        self.cache = cache
+        # An optional ghedt.gfunction_library.GFunctionLibrary that the
+        # g-functions of the fields are interpolated from during the search
+        self.library = library
+        # The fidelity of the g-functions used during the search, 'high',
+        # 'coarse-to-fine' or 'surrogate' (see
+        # ghedt.search_routines.Bisection1D), and the optional
+        # ghedt.gfunction_surrogate.GFunctionSurrogate of the 'surrogate'
+        # fidelity
+        self.fidelity = fidelity
+        self.surrogate = surrogate
 
     def find_design(self, disp=False):
         if disp:
@@ -92,14 +107,18 @@ class Design:
                 self.coordinates_domain, self.V_flow, self.borehole,
                 self.bhe_object, self.fluid, self.pipe, self.grout,
                 self.soil, self.sim_params, self.hourly_extraction_ground_loads,
-                method=self.method, flow=self.flow, disp=disp)
+                method=self.method, flow=self.flow, disp=disp,
+                cache=self.cache, library=self.library,
+                fidelity=self.fidelity, surrogate=self.surrogate)
         # Find a rectangle
         elif self.routine == 'rectangle':
             bisection_search = dt.search_routines.Bisection1D(
                 self.coordinates_domain, self.V_flow, self.borehole,
                 self.bhe_object, self.fluid, self.pipe, self.grout, self.soil,
                 self.sim_params, self.hourly_extraction_ground_loads,
-                method=self.method, flow=self.flow, disp=disp)
+                method=self.method, flow=self.flow, disp=disp,
+                cache=self.cache, library=self.library,
+                fidelity=self.fidelity, surrogate=self.surrogate)
         # Find a bi-rectangle
         elif self.routine == 'bi-rectangle':
             bisection_search = dt.search_routines.Bisection2D(
@@ -107,17 +126,24 @@ class Design:
                 self.borehole, self.bhe_object, self.fluid, self.pipe,
                 self.grout, self.soil, self.sim_params,
                 self.hourly_extraction_ground_loads, method=self.method,
-                flow=self.flow, disp=disp)
+                flow=self.flow, disp=disp, cache=self.cache,
+                library=self.library, fidelity=self.fidelity,
+                surrogate=self.surrogate)
         # Find bi-zoned rectangle
         elif self.routine == 'bi-zoned':
             bisection_search = dt.search_routines.BisectionZD(
                 self.coordinates_domain_nested, self.V_flow, self.borehole,
                 self.bhe_object, self.fluid, self.pipe, self.grout, self.soil,
                 self.sim_params, self.hourly_extraction_ground_loads,
-                method=self.method, flow=self.flow, disp=disp)
+                method=self.method, flow=self.flow, disp=disp,
+                cache=self.cache, library=self.library,
+                fidelity=self.fidelity, surrogate=self.surrogate)
         else:
             raise ValueError('The requested routine is not available. '
                              'The currently available routines are: '
                              '`near-square`.')
 
+        if disp:
+            print(bisection_search.evaluation_report())
+
         return bisection_search
@@ -27,7 +27,7 @@ def remove_cutout(coordinates, boundary=None, remove_inside=True,
     coordinates = scale_coordinates(coordinates, scale)
     boundary = scale_coordinates(boundary, scale)
 
-    _boundary = np.array(boundary, dtype=np.uint64)
+    _boundary = np.array(boundary, dtype=np.int32).reshape(-1, 2)
 
     # https://stackoverflow.com/a/50670359/11637415
     # Positive - point is inside the contour
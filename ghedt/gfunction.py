@@ -1,18 +1,249 @@
 # Jack C. Cook
 # Monday, October 25, 2021
+import concurrent.futures
 import copy
 import warnings
 
-from scipy.interpolate import interp1d, lagrange
+from scipy.interpolate import interp1d, BarycentricInterpolator
+import ghedt as dt
 import pygfunction as gt
 import numpy as np
 
 
+class ResponseFactorCache:
+    """
+    The segment-to-segment finite line source (FLS) response factors between
+    two boreholes, kept by distance between the g-function calculations of
+    the equivalent (and symmetric) solvers.
+
+    Consecutive fields of a coordinates domain (and most fields of a search
+    at the same height) share most of the distances between their boreholes,
+    so only the response factors at the distances that are new to a field are
+    evaluated. The response factors are kept separately for each set of time
+    values, soil thermal diffusivity and segment lengths and depths.
+
+    Parameters
+    ----------
+    rtol: float, optional
+        The relative tolerance for a distance to match a stored distance.
+        Default is 1e-9.
+    """
+
+    def __init__(self, rtol: float = 1.0e-9):
+        self.rtol = rtol
+        # The sorted distances, and the response factors (distances x segment
+        # pairs x time) at those distances, for each key
+        self.distances = {}
+        self.h = {}
+
+        # The number of distances found and not found
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(time, alpha, H1, D1, H2, D2) -> tuple:
+        return tuple(np.asarray(value, dtype=np.double).tobytes()
+                     for value in [time, alpha, H1, D1, H2, D2])
+
+    def _find(self, key, distances) -> np.ndarray:
+        # The index of the stored distance that matches each distance, or -1
+        index = np.full(len(distances), -1)
+        stored = self.distances.get(key)
+        if stored is None:
+            return index
+        n = len(stored)
+        right = np.minimum(np.searchsorted(stored, distances), n - 1)
+        left = np.maximum(right - 1, 0)
+        closest = np.where(
+            np.abs(stored[left] - distances) < np.abs(stored[right] - distances),
+            left, right)
+        found = np.abs(stored[closest] - distances) <= self.rtol * distances
+        index[found] = closest[found]
+        return index
+
+    def get(self, key, distances, compute) -> np.ndarray:
+        """
+        The response factors at each distance. The response factors at the
+        distances that are not stored are evaluated by compute (a function of
+        an array of distances) and stored.
+
+        Returns
+        -------
+        h: np.ndarray
+            The response factors (distances x segment pairs x time).
+        """
+        distances = np.asarray(distances, dtype=np.double)
+        if len(distances) == 0:
+            return compute(distances)
+        index = self._find(key, distances)
+        missing = index < 0
+        self.hits += int(np.sum(~missing))
+        self.misses += int(np.sum(missing))
+
+        if np.any(missing):
+            new_distances = np.unique(distances[missing])
+            h_new = compute(new_distances)
+            if key in self.distances:
+                new_distances = np.concatenate(
+                    (self.distances[key], new_distances))
+                h_new = np.concatenate((self.h[key], h_new))
+            order = np.argsort(new_distances)
+            self.distances[key] = new_distances[order]
+            self.h[key] = h_new[order]
+            index = self._find(key, distances)
+
+        return self.h[key][index]
+
+    def clear(self) -> None:
+        self.distances.clear()
+        self.h.clear()
+
+
+# The equivalent and symmetric solvers below are built on private parts of
+# pygfunction (checked against pygfunction 2.1). When they are not found, the
+# stock solvers of pygfunction are used instead.
+_Equivalent = getattr(gt.gfunction, '_Equivalent', object)
+_SOLVER_INTERNALS_FOUND = all([
+    hasattr(_Equivalent, '_find_unique_distances'),
+    hasattr(_Equivalent, '_map_axial_segment_pairs'),
+    hasattr(gt.boreholes, '_EquivalentBorehole'),
+    hasattr(gt.networks, '_EquivalentNetwork')])
+
+
+class _CachedEquivalent(_Equivalent):
+    # The equivalent borehole solver of pygfunction, where the FLS response
+    # factors are evaluated for each distance between the boreholes (and
+    # taken from a ResponseFactorCache when they have already been evaluated)
+    # rather than summed over the distances inside of the integral. The
+    # results are the same to the accuracy of the numerical integration.
+    def initialize(self, response_factors=None, **kwargs):
+        self.response_factors = response_factors
+        return super().initialize(**kwargs)
+
+    def thermal_response_factors(self, time, alpha, kind='linear'):
+        if self.response_factors is None or np.isscalar(time):
+            return super().thermal_response_factors(time, alpha, kind=kind)
+
+        nt = len(time)
+        h_ij = np.zeros((self.nSources, self.nSources, nt+1), dtype=self.dtype)
+        segment_lengths = self.segment_lengths()
+
+        def response_factors(dis, H1, D1, H2, D2):
+            H1, D1, H2, D2 = [x.reshape(1, -1) for x in [H1, D1, H2, D2]]
+            key = self.response_factors.key(time, alpha, H1, D1, H2, D2)
+            return self.response_factors.get(
+                key, dis,
+                lambda d: gt.heat_transfer.finite_line_source_vectorized(
+                    time, alpha, d.reshape(-1, 1), H1, D1, H2, D2))
+
+        # Borehole-to-borehole thermal interactions
+        for indices in self.borehole_to_borehole:
+            i, j = indices[0]
+            dis, wDis = self._find_unique_distances(self.dis, indices)
+            # Only the distances found between the pairs of boreholes
+            used = wDis.sum(axis=1) > 0
+            dis = dis.flatten()[used]
+            wDis = wDis[used].astype(np.double)
+            H1, D1, H2, D2, i_pair, j_pair, k_pair = \
+                self._map_axial_segment_pairs(i, j)
+            N2 = np.array([self.boreholes[j].nBoreholes for (i, j) in indices])
+            h_dis = response_factors(dis, H1, D1, H2, D2)
+            # The response factors of an equivalent borehole are the sum of
+            # the response factors at each distance
+            h = np.einsum('dk,dpt->kpt', wDis, h_dis) / N2[:, None, None]
+            for k in range(len(indices)):
+                (i, j) = indices[k]
+                i_segment = self._i0Segments[i] + i_pair
+                j_segment = self._i0Segments[j] + j_pair
+                h_ij[j_segment, i_segment, 1:] = h[k, k_pair, :]
+                if not i == j:
+                    h_ij[i_segment, j_segment, 1:] = (h[k, k_pair, :].T
+                        * segment_lengths[j_segment]
+                        / segment_lengths[i_segment]).T
+
+        # Same-borehole thermal interactions
+        for group in self.borehole_to_self:
+            i = group[0]
+            H1, D1, H2, D2, i_pair, j_pair, k_pair = \
+                self._map_axial_segment_pairs(i, i)
+            h = response_factors(
+                np.array([self.boreholes[i].r_b]), H1, D1, H2, D2)
+            for i in group:
+                i_segment = self._i0Segments[i] + i_pair
+                j_segment = self._i0Segments[i] + j_pair
+                h_ij[j_segment, i_segment, 1:] = \
+                    h_ij[j_segment, i_segment, 1:] + h[0, k_pair, :]
+
+        return interp1d(np.hstack((0., time)), h_ij, kind=kind, copy=True,
+                        axis=2)
+
+
+class _SymmetricEquivalent(_CachedEquivalent):
+    # The equivalent borehole solver of pygfunction, where each equivalent
+    # borehole is a group of boreholes that are images of each other under
+    # the symmetries of the field (see ghedt.coordinates.symmetry_groups)
+    # rather than a group found by clustering. The boreholes in such a group
+    # have the same heat extraction rates and borehole wall temperatures, so
+    # only one borehole of each group is solved for.
+    def initialize(self, groups=None, **kwargs):
+        self.groups = groups
+        return super().initialize(**kwargs)
+
+    def find_groups(self, tol=1e-6):
+        self.nBoreholes = len(self.boreholes)
+        # Equivalent field formed by all boreholes
+        eqField = gt.boreholes._EquivalentBorehole(self.boreholes)
+        self.clusters = list(self.groups)
+        self.nEqBoreholes = max(self.clusters) + 1
+        # Overwrite boreholes with equivalent boreholes
+        self.boreholes = [gt.boreholes._EquivalentBorehole(
+            [self.boreholes[j] for j in range(self.nBoreholes)
+             if self.clusters[j] == i])
+            for i in range(self.nEqBoreholes)]
+        self.wBoreholes = np.array([b.nBoreholes for b in self.boreholes])
+        # Find similar pairs of boreholes
+        self.borehole_to_self, self.borehole_to_borehole = \
+            self._find_axial_borehole_pairs(self.boreholes)
+        # Store unique distances in the bore field
+        self.dis = eqField.unique_distance(eqField, self.disTol)[0][1:]
+
+        if self.boundary_condition == 'MIFT':
+            pipes = [self.network.p[self.clusters.index(i)]
+                     for i in range(self.nEqBoreholes)]
+            self.network = gt.networks._EquivalentNetwork(
+                self.boreholes,
+                pipes,
+                m_flow_network=self.network.m_flow_network,
+                cp_f=self.network.cp_f,
+                nSegments=self.nBoreSegments[0],
+                segment_ratios=self.segment_ratios[0])
+
+        return self.nBoreSegments[0] * self.nEqBoreholes
+
+
 def calculate_g_function(
         m_flow_borehole, bhe_object, time_values, coordinates, borehole,
         fluid, pipe, grout, soil, nSegments=8, end_length_ratio=0.02,
         segments='unequal', solver='equivalent', boundary='MIFT',
-        segment_ratios=None, disp=False):
+        segment_ratios=None, disp=False, response_factors=None):
+    # solver: 'equivalent', 'similarities' or 'detailed' (the solvers of
+    # pygfunction), or 'symmetric', which only solves for one borehole of
+    # each group of boreholes that are images of each other under the
+    # symmetries of the field.
+    # response_factors: an optional ResponseFactorCache that the FLS response
+    # factors of the equivalent and symmetric solvers are taken from (and
+    # stored in).
+    # When the pygfunction internals that the symmetric solver and the
+    # response factor cache rely on are not found, the 'symmetric' solver
+    # falls back to the 'similarities' solver, and the response factors are
+    # not reused.
+    if not _SOLVER_INTERNALS_FOUND:
+        if solver == 'symmetric':
+            warnings.warn('The symmetric solver is not supported by this '
+                          'version of pygfunction, the similarities solver '
+                          'is used instead.')
+            solver = 'similarities'
+        response_factors = None
 
     boreField = []
     BHEs = []
@@ -27,10 +258,13 @@ def calculate_g_function(
         x, y = coordinates[i]
         _borehole = gt.boreholes.Borehole(H, D, r_b, x, y, tilt, orientation)
         boreField.append(_borehole)
-        # Initialize pipe model
+        # Initialize pipe model. The boreholes only differ by their position,
+        # so the same pipe model (and its thermal resistances) is used for
+        # every borehole.
         if boundary == 'MIFT':
-            bhe = \
-                bhe_object(m_flow_borehole, fluid, _borehole, pipe, grout, soil)
+            if i == 0:
+                bhe = bhe_object(
+                    m_flow_borehole, fluid, _borehole, pipe, grout, soil)
             BHEs.append(bhe)
 
     alpha = soil.k / soil.rhoCp
@@ -51,61 +285,226 @@ def calculate_g_function(
         raise ValueError('Equal or Unequal are acceptable options '
                          'for segments.')
 
+    replace_solver = solver == 'symmetric' or \
+        (solver == 'equivalent' and response_factors is not None)
+    if replace_solver:
+        # Set up the g-function with the (inexpensive) detailed solver, and
+        # replace the solver before the g-function is evaluated
+        method = 'detailed'
+        evaluation_time = None
+    else:
+        method = solver
+        evaluation_time = time_values
+
     if boundary == 'UHTR' or boundary == 'UBWT':
         gfunc = gt.gfunction.gFunction(
-            boreField, alpha, time=time_values, boundary_condition=boundary,
-            options=options, method=solver
+            boreField, alpha, time=evaluation_time,
+            boundary_condition=boundary, options=options, method=method
         )
     elif boundary == 'MIFT':
         m_flow_network = len(boreField) * m_flow_borehole
         network = gt.networks.Network(
             boreField, BHEs, m_flow_network=m_flow_network, cp_f=fluid.cp)
         gfunc = gt.gfunction.gFunction(
-            network, alpha, time=time_values,
-            boundary_condition=boundary, options=options, method=solver)
+            network, alpha, time=evaluation_time,
+            boundary_condition=boundary, options=options, method=method)
     else:
         raise ValueError('UHTR, UBWT or MIFT are accepted boundary conditions.')
 
-    return gfunc
+    if solver == 'symmetric':
+        groups = dt.coordinates.symmetry_groups(coordinates)
+        gfunc.solver = _SymmetricEquivalent(
+            gfunc.boreholes, gfunc.network, time_values, boundary,
+            groups=groups, response_factors=response_factors, **options)
+    elif replace_solver:
+        gfunc.solver = _CachedEquivalent(
+            gfunc.boreholes, gfunc.network, time_values, boundary,
+            response_factors=response_factors, **options)
+    if replace_solver:
+        gfunc.evaluate_g_function(time_values)
 
+    return gfunc
 
-def compute_live_g_function(
-        B: float, H_values: list, r_b_values: list, D_values: list,
-        m_flow_borehole, bhe_object, log_time,  coordinates,
-        fluid, pipe, grout, soil, nSegments=8, segments='unequal',
-        solver='equivalent', boundary='MIFT', segment_ratios=None, disp=False):
 
-    d = {'g': {}, 'bore_locations': coordinates, 'logtime': log_time}
+def _calculate_g_values(
+        m_flow_borehole, bhe_object, log_time, coordinates, H, r_b, D, fluid,
+        pipe, grout, soil, nSegments, segments, solver, boundary,
+        segment_ratios, disp, response_factors=None):
+    # Compute the g-function values for a single height. This is defined at
+    # the module level so that it can be run in a separate process.
+    _borehole = gt.boreholes.Borehole(H, D, r_b, 0., 0.)
 
-    for i in range(len(H_values)):
+    alpha = soil.k / soil.rhoCp
 
-        H = H_values[i]
-        r_b = r_b_values[i]
-        D = D_values[i]
-        _borehole = gt.boreholes.Borehole(H, D, r_b, 0., 0.)
+    ts = H ** 2 / (9. * alpha)  # Bore field characteristic time
+    time_values = np.exp(log_time) * ts
 
-        alpha = soil.k / soil.rhoCp
+    gfunc = calculate_g_function(
+        m_flow_borehole, bhe_object, time_values, coordinates, _borehole,
+        fluid, pipe, grout, soil, nSegments=nSegments, segments=segments,
+        solver=solver, boundary=boundary, segment_ratios=segment_ratios,
+        disp=disp, response_factors=response_factors)
 
-        ts = H ** 2 / (9. * alpha)  # Bore field characteristic time
-        time_values = np.exp(log_time) * ts
+    return gfunc.gFunc
 
-        gfunc = calculate_g_function(
-            m_flow_borehole, bhe_object, time_values, coordinates, _borehole,
-            fluid, pipe, grout, soil, nSegments=nSegments, segments=segments,
-            solver=solver, boundary=boundary, segment_ratios=segment_ratios,
-            disp=disp)
 
-        key = '{}_{}_{}_{}'.format(B, H, r_b, D)
+def compute_live_g_function(
+        B: float, H_values: list, r_b_values: list, D_values: list,
+        m_flow_borehole, bhe_object, log_time,  coordinates,
+        fluid, pipe, grout, soil, nSegments=8, segments='unequal',
+        solver='equivalent', boundary='MIFT', segment_ratios=None, disp=False,
+        cache=None, n_workers=1, response_factors=None):
+    # cache: an optional ghedt.gfunction_cache.GFunctionCache. The g-function
+    # for each height is loaded from the cache when it has been computed
+    # before with the same inputs, and is stored in the cache otherwise.
+    # n_workers: the number of processes the g-functions for the different
+    # heights are computed in at the same time. The default (1) computes them
+    # one after another in the current process.
+    # response_factors: an optional ResponseFactorCache that keeps the FLS
+    # response factors between calls (e.g. for the consecutive fields of a
+    # search). It is only used for the heights computed in the current
+    # process.
+
+    g_values = [None] * len(H_values)
+    cache_keys = [None] * len(H_values)
+    if cache is not None:
+        for i in range(len(H_values)):
+            cache_keys[i] = cache.key(
+                coordinates, H_values[i], r_b_values[i], D_values[i],
+                m_flow_borehole, bhe_object, log_time, fluid, pipe, grout,
+                soil, nSegments, segments, solver, boundary, segment_ratios)
+            g_values[i] = cache.get(cache_keys[i])
+
+    # The heights whose g-function needs computed
+    missing = [i for i in range(len(H_values)) if g_values[i] is None]
+    inputs = [(m_flow_borehole, bhe_object, log_time, coordinates,
+               H_values[i], r_b_values[i], D_values[i], fluid, pipe, grout,
+               soil, nSegments, segments, solver, boundary, segment_ratios,
+               disp) for i in missing]
+
+    if n_workers > 1 and len(missing) > 1:
+        max_workers = min(n_workers, len(missing))
+        with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+            results = list(executor.map(_calculate_g_values, *zip(*inputs)))
+    else:
+        results = [_calculate_g_values(*args,
+                                       response_factors=response_factors)
+                   for args in inputs]
 
-        d['g'][key] = gfunc.gFunc.tolist()
+    for i, result in zip(missing, results):
+        g_values[i] = result
+        if cache is not None:
+            cache.set(cache_keys[i], result)
 
-    geothermal_g_input = GFunction.configure_database_file_for_usage(d)
     # Initialize the GFunction object
-    g_function = GFunction(**geothermal_g_input)
+    g_function = GFunction.from_values(
+        B, H_values, r_b_values, D_values,
+        [np.asarray(g).tolist() for g in g_values], log_time, coordinates)
 
     return g_function
 
 
+def save_g_functions(path: str, g_functions: list) -> None:
+    """
+    Save GFunction objects to a single uncompressed numpy archive (.npz).
+
+    The g-function values, heights, borehole radii, burial depths, ln(t/ts)
+    values and coordinates of all of the objects are concatenated into one
+    array each, with offsets to the part of each array that belongs to each
+    object. Loading them (:func:`load_g_functions`) reads a handful of arrays
+    regardless of the number of objects, and does not parse any text.
+
+    Parameters
+    ----------
+    path: str
+        The path to the file. numpy adds the .npz extension if it is missing.
+    g_functions: list
+        The GFunction objects.
+    """
+    B = []
+    H_values, r_b_values, D_values = [], [], []
+    log_time, g_values, bore_locations = [], [], []
+    offsets = {'height': [0], 'log_time': [0], 'g': [0],
+               'bore_location': [0]}
+    for g_function in g_functions:
+        heights = list(g_function.g_lts.keys())
+        B.append(g_function.B)
+        H_values.extend(heights)
+        r_b_values.extend([g_function.r_b_values[H] for H in heights])
+        D_values.extend([g_function.D_values[H] for H in heights])
+        log_time.append(np.asarray(g_function.log_time, dtype=np.double))
+        g_values.append(np.ravel(
+            [g_function.g_lts[H] for H in heights]).astype(np.double))
+        bore_locations.append(np.asarray(
+            g_function.bore_locations, dtype=np.double).reshape(-1, 2))
+
+        offsets['height'].append(offsets['height'][-1] + len(heights))
+        offsets['log_time'].append(offsets['log_time'][-1] + log_time[-1].size)
+        offsets['g'].append(offsets['g'][-1] + g_values[-1].size)
+        offsets['bore_location'].append(
+            offsets['bore_location'][-1] + len(bore_locations[-1]))
+
+    def concatenate(arrays, shape):
+        if len(arrays) == 0:
+            return np.empty(shape)
+        return np.concatenate(arrays)
+
+    np.savez(path, B=np.array(B, dtype=np.double),
+             H_values=np.array(H_values, dtype=np.double),
+             r_b_values=np.array(r_b_values, dtype=np.double),
+             D_values=np.array(D_values, dtype=np.double),
+             log_time=concatenate(log_time, (0,)),
+             g_values=concatenate(g_values, (0,)),
+             bore_locations=concatenate(bore_locations, (0, 2)),
+             **{key + '_offsets': np.array(value, dtype=np.int64)
+                for key, value in offsets.items()})
+
+
+def load_g_functions(path: str, mmap_mode=None) -> list:
+    """
+    Load the GFunction objects saved by :func:`save_g_functions`.
+
+    Parameters
+    ----------
+    path: str
+        The path to the file.
+    mmap_mode: str, optional
+        If given ('r', 'r+' or 'c', see numpy.memmap), the arrays are
+        memory-mapped from the file rather than read, and only the parts
+        of the file that are used are read from the disk. Default is None.
+
+    Returns
+    -------
+    g_functions: list
+        The GFunction objects. The g-function values of each height and the
+        coordinates are numpy arrays (views of the arrays in the file).
+    """
+    data = dt.utilities.npz_load(path, mmap_mode=mmap_mode)
+    height_offsets = data['height_offsets'].tolist()
+    log_time_offsets = data['log_time_offsets'].tolist()
+    g_offsets = data['g_offsets'].tolist()
+    bore_location_offsets = data['bore_location_offsets'].tolist()
+    B = data['B'].tolist()
+    H_values = data['H_values'].tolist()
+    r_b_values = data['r_b_values'].tolist()
+    D_values = data['D_values'].tolist()
+
+    g_functions = []
+    for i in range(len(B)):
+        heights = slice(height_offsets[i], height_offsets[i + 1])
+        log_time = data['log_time'][log_time_offsets[i]:
+                                    log_time_offsets[i + 1]]
+        g_values = data['g_values'][g_offsets[i]:g_offsets[i + 1]].reshape(
+            -1, len(log_time))
+        bore_locations = data['bore_locations'][
+            bore_location_offsets[i]:bore_location_offsets[i + 1]]
+        g_functions.append(GFunction.from_values(
+            B[i], H_values[heights], r_b_values[heights], D_values[heights],
+            g_values, log_time, bore_locations))
+
+    return g_functions
+
+
 class GFunction:
     def __init__(self, B: float, r_b_values: dict, D_values: dict,
                  g_lts: dict, log_time: list, bore_locations: list):
@@ -120,24 +519,60 @@ class GFunction:
         self.bore_locations: list = bore_locations
         # self.time: dict = {}  # the time values in years
 
-        # an interpolation table for B/H ratios, D, r_b (used in the method
-        # g_function_interpolation)
+        # interpolation tables for B/H ratios, D, r_b keyed by the kind of
+        # interpolation (used in the method g_function_interpolation)
         self.interpolation_table: dict = {}
 
-    def g_function_interpolation(self, B_over_H: float, kind='default'):
+    @staticmethod
+    def from_values(B: float, H_values, r_b_values, D_values, g_values,
+                    log_time, bore_locations):
+        """
+        Create a GFunction from the g-function values (and borehole radius and
+        burial depth) of each height. The heights are sorted.
+
+        Returns
+        -------
+        g_function: GFunction
+        """
+        order = sorted(range(len(H_values)), key=lambda i: H_values[i])
+        heights = [float(H_values[i]) for i in order]
+        return GFunction(
+            B, dict(zip(heights, [r_b_values[i] for i in order])),
+            dict(zip(heights, [D_values[i] for i in order])),
+            dict(zip(heights, [g_values[i] for i in order])), log_time,
+            bore_locations)
+
+    def save(self, path: str) -> None:
+        """
+        Save the g-functions, coordinates and borehole dimensions to a numpy
+        archive (see :func:`save_g_functions`).
+        """
+        save_g_functions(path, [self])
+
+    @staticmethod
+    def load(path: str, mmap_mode=None):
+        """
+        Load a GFunction saved by :meth:`save` (see :func:`load_g_functions`).
+        """
+        return load_g_functions(path, mmap_mode=mmap_mode)[0]
+
+    def g_function_interpolation(self, B_over_H, kind='default'):
         """
         Interpolate a range of g-functions for a specific B/H ratio
         Parameters
         ----------
-        B_over_H: float
-            A B/H ratio
+        B_over_H: float or array_like
+            A B/H ratio, or an array of B/H ratios that are interpolated for
+            at once
         kind: str
             Could be 'linear', 'quadratic', 'cubic', etc.
             default: 'cubic'
         Returns
         -------
         **g-function: list**
-            A list of the g-function values for each ln(t/ts)
+            A list of the g-function values for each ln(t/ts). If an array of
+            B/H ratios is given, this is an array with a row of g-function
+            values for each B/H ratio.
         **rb: float**
             A borehole radius value that is interpolated for
         **D: float**
@@ -147,24 +582,26 @@ class GFunction:
             .. math::
                 H_{eq} = \dfrac{B_{field}}{B/H}
         """
+        if not np.isscalar(B_over_H):
+            B_over_H = np.asarray(B_over_H, dtype=np.double)
         # the g-functions are stored in a dictionary based on heights, so an
         # equivalent height can be found
         H_eq = 1 / B_over_H * self.B
 
         # Determine if we are out of range and need to extrapolate
         height_values = list(self.g_lts.keys())
+        min_height = min(height_values)
+        max_height = max(height_values)
         # If we are close to the outer bounds, then set H_eq as outer bounds
-        if abs(H_eq - max(height_values)) < 1.0e-6:
-            H_eq = max(height_values)
-        if abs(H_eq - min(height_values)) < 1.0e-6:
-            H_eq = min(height_values)
-
-        if min(height_values) <= H_eq <= max(height_values):
-            fill_value = ''
-        elif abs(min(height_values) - H_eq) < 0.001:
-            fill_value = ''
-        else:
-            fill_value = 'extrapolate'
+        H_eq = np.where(abs(H_eq - max_height) < 1.0e-6, max_height, H_eq)
+        H_eq = np.where(abs(H_eq - min_height) < 1.0e-6, min_height, H_eq)
+        if np.isscalar(B_over_H):
+            H_eq = H_eq.tolist()
+
+        in_range = np.logical_or(
+            np.logical_and(min_height <= H_eq, H_eq <= max_height),
+            abs(min_height - np.asarray(H_eq)) < 0.001)
+        if not np.all(in_range):
             warnings.warn('Extrapolation is being used.')
 
         # if the interpolation kind is default, use what we know about the
@@ -178,20 +615,15 @@ class GFunction:
             elif num_curves == 2:
                 kind = 'linear'
             else:
-                if (H_eq-height_values[0]) / height_values[0] < 0.001:
-                    g_function = self.g_lts[height_values[0]]
-                    rb = self.r_b_values[height_values[0]]
-                    D = self.D_values[height_values[0]]
-                    return g_function, rb, D, H_eq
-                elif min(height_values) - H_eq < 0.001:
-                    g_function = self.g_lts[height_values[0]]
-                    rb = self.r_b_values[height_values[0]]
-                    D = self.D_values[height_values[0]]
-                    return g_function, rb, D, H_eq
+                # The only g-function available is used
+                g_function = self.g_lts[height_values[0]]
+                if not np.isscalar(B_over_H):
+                    g_function = np.tile(g_function, (np.size(H_eq), 1))
                 else:
-                    raise ValueError(
-                        'The interpolation requires two g-function curves if '
-                        'the requested B/H is not already computed.')
+                    g_function = np.asarray(g_function).tolist()
+                rb = self.r_b_values[height_values[0]]
+                D = self.D_values[height_values[0]]
+                return g_function, rb, D, H_eq
 
         # Automatically adjust interpolation if necessary
         # Lagrange also needs 2
@@ -207,67 +639,51 @@ class GFunction:
             if required_curves > len(height_values):
                 kind = curves_by_kind[len(height_values)]
 
-        # if the interpolation table is not yet know, build it
-        if len(self.interpolation_table) == 0:
-            # create an interpolation for the g-function which takes the height
-            # (or equivilant height) as an input the g-function needs to be
-            # interpolated at each point in dimensionless time
-            self.interpolation_table['g'] = []
-            for i, lntts in enumerate(self.log_time):
-                x = []
-                y = []
-                for key in self.g_lts:
-                    height_value = float(key)
-                    g_value = self.g_lts[key][i]
-                    x.append(height_value)
-                    y.append(g_value)
-                if kind == 'lagrange':
-                    f = lagrange(x, y)
-                else:
-                    f = interp1d(x, y, kind=kind, fill_value=fill_value)
-                self.interpolation_table['g'].append(f)
-            # create interpolation tables for 'D' and 'r_b' by height
-            keys = list(self.r_b_values.keys())
-            height_values: list = []
-            rb_values: list = []
-            D_values: list = []
-            for h in keys:
-                height_values.append(float(h))
-                rb_values.append(self.r_b_values[h])
-                try:
-                    D_values.append(self.D_values[h])
-                except:
-                    pass
-            if kind == 'lagrange':
-                rb_f = lagrange(height_values, rb_values)
-            else:
-                # interpolation function for rb values by H equivalent
-                rb_f = interp1d(height_values, rb_values, kind=kind,
-                                fill_value=fill_value)
-            self.interpolation_table['rb'] = rb_f
-            try:
-                if kind == 'lagrange':
-                    D_f = lagrange(height_values, D_values)
-                else:
-                    D_f = interp1d(height_values, D_values, kind=kind,
-                                   fill_value=fill_value)
-                self.interpolation_table['D'] = D_f
-            except:
-                pass
+        # if the interpolation table is not yet know for this kind, build it
+        if kind not in self.interpolation_table:
+            self.interpolation_table[kind] = \
+                self.create_interpolation_table(kind)
+        table = self.interpolation_table[kind]
 
-        # create the g-function by interpolating at each ln(t/ts) value
-        rb_value = self.interpolation_table['rb'](H_eq)
-        try:
-            D_value = self.interpolation_table['D'](H_eq)
-        except:
+        # interpolate the g-function at every ln(t/ts) value at once
+        rb_value = table['rb'](H_eq)
+        if 'D' in table:
+            D_value = table['D'](H_eq)
+        else:
             D_value = None
-        g_function: list = []
-        for i in range(len(self.log_time)):
-            f = self.interpolation_table['g'][i]
-            g = f(H_eq).tolist()
-            g_function.append(g)
+        g_function = table['g'](H_eq)
+        if np.isscalar(B_over_H):
+            g_function = g_function.tolist()
         return g_function, rb_value, D_value, H_eq
 
+    def create_interpolation_table(self, kind: str) -> dict:
+        # Create the interpolation functions of the g-function, D and r_b by
+        # height. The g-functions are stored in a 2D array (heights x
+        # ln(t/ts)), so a single function interpolates the g-function at all
+        # of the ln(t/ts) values. Values outside of the range of heights are
+        # extrapolated.
+        def interpolation_function(x, y):
+            if kind == 'lagrange':
+                return BarycentricInterpolator(x, y, axis=0)
+            return interp1d(x, y, kind=kind, axis=0, fill_value='extrapolate')
+
+        table = {}
+        height_values = [float(key) for key in self.g_lts]
+        g_values = np.array([self.g_lts[key] for key in self.g_lts])
+        table['g'] = interpolation_function(height_values, g_values)
+
+        # create interpolation tables for 'D' and 'r_b' by height
+        keys = list(self.r_b_values.keys())
+        height_values = [float(h) for h in keys]
+        rb_values = [self.r_b_values[h] for h in keys]
+        table['rb'] = interpolation_function(height_values, rb_values)
+        # the D values are not available for older g-function files
+        if all(h in self.D_values for h in keys):
+            D_values = [self.D_values[h] for h in keys]
+            table['D'] = interpolation_function(height_values, D_values)
+
+        return table
+
     @staticmethod
     def borehole_radius_correction(g_function: list, rb: float, rb_star: float):
         """
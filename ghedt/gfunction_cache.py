@@ -0,0 +1,221 @@
+# agent
+# Saturday, October 17, 2026
+
+import collections
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+
+class GFunctionCache:
+    """
+    A persistent cache of computed g-functions stored on the local disk.
+
+    Each g-function is stored in its own numpy binary file (.npy) named by a
+    hash of every input that the g-function depends on, so that identical
+    calculations (e.g. repeated design runs of the same site with different
+    loads) are loaded from disk rather than recomputed. When the total size of
+    the stored g-functions exceeds `max_size`, the least recently used
+    g-functions are removed.
+
+    Parameters
+    ----------
+    directory: str
+        The directory the g-functions are stored in. It is created if it does
+        not exist.
+    max_size: int, optional
+        The maximum total size (bytes) of the stored g-functions. Default is
+        100 MB.
+    """
+
+    extension = '.npy'
+
+    def __init__(self, directory: str, max_size: int = 100 * 1024 ** 2):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+        # The number of g-functions found and not found in the cache
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(coordinates, H, r_b, D, m_flow_borehole, bhe_object, log_time,
+            fluid, pipe, grout, soil, nSegments, segments, solver, boundary,
+            segment_ratios) -> str:
+        """
+        The hash of the inputs to a single g-function calculation (see
+        :func:`ghedt.gfunction.calculate_g_function`).
+        """
+        def flatten(value):
+            return tuple(np.ravel(value).tolist())
+
+        # Numbers are converted to python floats so that the representation
+        # does not depend on whether numpy or python types were given
+        inputs = (
+            flatten(coordinates), flatten([H, r_b, D, m_flow_borehole]),
+            bhe_object.__module__ + '.' + bhe_object.__qualname__,
+            flatten(log_time),
+            flatten([fluid.rho, fluid.cp, fluid.mu, fluid.k]),
+            (flatten(pipe.pos), flatten(pipe.r_in), flatten(pipe.r_out),
+             flatten([pipe.s, pipe.eps]), flatten(pipe.k),
+             flatten(pipe.rhoCp)),
+            flatten([grout.k, grout.rhoCp, soil.k, soil.rhoCp]),
+            int(nSegments), segments.lower(), solver, boundary,
+            None if segment_ratios is None else flatten(segment_ratios))
+
+        return hashlib.sha256(repr(inputs).encode('utf-8')).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.extension)
+
+    def get(self, key: str):
+        """
+        The g-function values stored for the key, or None if the g-function
+        is not in the cache.
+        """
+        path = self.path(key)
+        try:
+            g_values = np.load(path)
+        except (FileNotFoundError, ValueError, OSError):
+            self.misses += 1
+            return None
+        # Mark the g-function as recently used
+        os.utime(path)
+        self.hits += 1
+        return g_values
+
+    def set(self, key: str, g_values) -> None:
+        """
+        Store the g-function values for the key, then remove the least
+        recently used g-functions if the cache is larger than its maximum size.
+        """
+        g_values = np.asarray(g_values, dtype=np.double)
+        # Write to a temporary file first so that an interrupted write (or a
+        # concurrent run) never leaves a partial g-function in the cache
+        fd, tmp_path = tempfile.mkstemp(
+            suffix='.tmp', dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, g_values)
+        os.replace(tmp_path, self.path(key))
+
+        self.evict()
+
+    def entries(self) -> list:
+        """
+        The (last used time, size, path) of each stored g-function, from the
+        least to the most recently used.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.extension):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        return entries
+
+    def size(self) -> int:
+        """
+        The total size (bytes) of the stored g-functions.
+        """
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used g-functions until the cache is no
+        larger than its maximum size.
+        """
+        entries = self.entries()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def clear(self) -> None:
+        """
+        Remove all of the stored g-functions.
+        """
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class LRUGFunctionCache:
+    """
+    An in-memory cache of the most recently used g-functions, for g-functions
+    that are requested more than once in a single process (e.g. the fields
+    that are revisited during a design search). The g-functions that are not
+    in memory are loaded from (and stored in) an optional persistent cache.
+
+    Parameters
+    ----------
+    maxsize: int, optional
+        The maximum number of g-functions kept in memory. Default is 256.
+    backing: GFunctionCache, optional
+        A persistent cache behind the in-memory cache. Default is None.
+    """
+
+    key = staticmethod(GFunctionCache.key)
+
+    def __init__(self, maxsize: int = 256, backing: GFunctionCache = None):
+        self.maxsize = maxsize
+        self.backing = backing
+        self.g_values = collections.OrderedDict()
+
+        # The number of g-functions found and not found in memory
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        """
+        The g-function values stored for the key, or None if the g-function
+        is neither in memory nor in the persistent cache.
+        """
+        if key in self.g_values:
+            self.g_values.move_to_end(key)
+            self.hits += 1
+            return self.g_values[key]
+
+        self.misses += 1
+        if self.backing is None:
+            return None
+        g_values = self.backing.get(key)
+        if g_values is not None:
+            self._store(key, g_values)
+        return g_values
+
+    def set(self, key: str, g_values) -> None:
+        """
+        Store the g-function values for the key in memory and in the
+        persistent cache.
+        """
+        g_values = np.asarray(g_values, dtype=np.double)
+        self._store(key, g_values)
+        if self.backing is not None:
+            self.backing.set(key, g_values)
+
+    def _store(self, key: str, g_values: np.ndarray) -> None:
+        self.g_values[key] = g_values
+        self.g_values.move_to_end(key)
+        while len(self.g_values) > self.maxsize:
+            self.g_values.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Remove all of the g-functions kept in memory.
+        """
+        self.g_values.clear()
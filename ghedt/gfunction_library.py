@@ -0,0 +1,179 @@
+# agent
+# Saturday, October 17, 2026
+
+import os
+
+import ghedt as dt
+import numpy as np
+import pygfunction as gt
+
+
+class GFunctionLibrary:
+    """
+    A library of g-functions precomputed for the fields of one or more
+    coordinate domains (e.g. the near-square, rectangle, bi-rectangle and
+    bi-zoned domains in :mod:`ghedt.domains`) over a range of heights.
+
+    The library is a single numpy archive (.npz) that holds one array of
+    g-function values (heights x ln(t/ts)) per field, indexed by a hash of
+    the field coordinates and every other input the g-functions depend on.
+    Only the fields that are looked up are read from the file, which is only
+    open while they are read. A field is found in the library only if it was
+    built with the same borehole heat exchanger, fluid, flow rate, soil,
+    grout and ln(t/ts) values, so the
+    g-function at any height in the range of the library can be interpolated
+    by the :class:`ghedt.gfunction.GFunction` that is returned.
+
+    Parameters
+    ----------
+    path: str
+        The path to the library file created by :meth:`build`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with np.load(path) as data:
+            self.keys = set(data.files)
+            self.H_values = data['H_values']
+            self.r_b = float(data['r_b'])
+            self.D = float(data['D'])
+            self.log_time = data['log_time']
+
+        # The number of fields found and not found in the library
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(coordinates, r_b, D, m_flow_borehole, bhe_object, log_time,
+            fluid, pipe, grout, soil) -> str:
+        """
+        The hash of the inputs to the g-functions of a field. The library
+        holds every height of the field, so the height is not part of the key.
+        """
+        return 'field_' + dt.gfunction_cache.GFunctionCache.key(
+            coordinates, 0., r_b, D, m_flow_borehole, bhe_object, log_time,
+            fluid, pipe, grout, soil, 8, 'unequal', 'equivalent', 'MIFT',
+            None)
+
+    @staticmethod
+    def fields(coordinates_domain):
+        """
+        The fields (lists of coordinates) of a coordinates domain, or of a
+        nested coordinates domain, in order.
+        """
+        if len(coordinates_domain) == 0:
+            return
+        if np.isscalar(coordinates_domain[0][0]):
+            # This is a single field
+            yield coordinates_domain
+            return
+        for domain in coordinates_domain:
+            yield from GFunctionLibrary.fields(domain)
+
+    @staticmethod
+    def build(path: str, coordinates_domain: list, H_values: list,
+              V_flow: float, borehole: gt.boreholes.Borehole, bhe_object,
+              fluid, pipe, grout, soil, flow: str = 'borehole', log_time=None,
+              cache=None, n_workers=1, disp=False):
+        """
+        Compute the g-functions of every field in the coordinates domain (or
+        nested coordinates domain) at each height, and add them to the
+        library file. If the file already exists, the fields in it are kept,
+        and the fields that are already in it are not recomputed. The flow
+        rate is set for each field in the same way as the design search does
+        (see :meth:`ghedt.search_routines.Bisection1D.retrieve_flow`).
+
+        Returns
+        -------
+        library: GFunctionLibrary
+            The library that has been built.
+        """
+        if log_time is None:
+            log_time = dt.utilities.Eskilson_log_times()
+        H_values = sorted(float(H) for H in H_values)
+        r_b = borehole.r_b
+        D = borehole.D
+
+        data = {'H_values': np.array(H_values), 'r_b': np.array(r_b),
+                'D': np.array(D), 'log_time': np.array(log_time)}
+        if os.path.exists(path):
+            with np.load(path) as existing:
+                if not np.array_equal(existing['H_values'], H_values) or \
+                        float(existing['r_b']) != r_b or \
+                        float(existing['D']) != D or \
+                        not np.array_equal(existing['log_time'], log_time):
+                    raise ValueError('The library file was built with '
+                                     'different heights, borehole radius, '
+                                     'burial depth or ln(t/ts) values.')
+                for name in existing.files:
+                    data[name] = existing[name]
+
+        fields = list(GFunctionLibrary.fields(coordinates_domain))
+        # Consecutive fields share most of the distances between their
+        # boreholes, so the FLS response factors are reused between fields
+        response_factors = dt.gfunction.ResponseFactorCache()
+        for i, coordinates in enumerate(fields):
+            if flow == 'borehole':
+                m_flow_borehole = V_flow / 1000. * fluid.rho
+            elif flow == 'system':
+                V_flow_borehole = V_flow / float(len(coordinates))
+                m_flow_borehole = V_flow_borehole / 1000. * fluid.rho
+            else:
+                raise ValueError('The flow argument should be either '
+                                 '`borehole` or `system`.')
+
+            key = GFunctionLibrary.key(
+                coordinates, r_b, D, m_flow_borehole, bhe_object, log_time,
+                fluid, pipe, grout, soil)
+            if key in data:
+                continue
+            if disp:
+                print('Field {} of {}: {} boreholes'.format(
+                    i + 1, len(fields), len(coordinates)))
+
+            B = dt.utilities.borehole_spacing(borehole, coordinates)
+            g_function = dt.gfunction.compute_live_g_function(
+                B, H_values, [r_b] * len(H_values), [D] * len(H_values),
+                m_flow_borehole, bhe_object, log_time, coordinates, fluid,
+                pipe, grout, soil, cache=cache, n_workers=n_workers,
+                response_factors=response_factors)
+            data[key] = np.array(
+                [g_function.g_lts[H] for H in g_function.g_lts])
+
+        # Write to a temporary file first so that an existing library is not
+        # lost if the write is interrupted
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **data)
+        os.replace(tmp_path, path)
+
+        return GFunctionLibrary(path)
+
+    def g_function(self, B, coordinates, borehole, m_flow_borehole,
+                   bhe_object, fluid, pipe, grout, soil, log_time=None):
+        """
+        The g-functions of a field at all of the heights in the library, or
+        None if the field is not in the library. The ln(t/ts) values of the
+        g-functions are part of the lookup, so a field is not found when they
+        differ from those of the library. Default is the ln(t/ts) values of
+        the library.
+
+        Returns
+        -------
+        g_function: ghedt.gfunction.GFunction or None
+        """
+        if log_time is None:
+            log_time = self.log_time
+        key = self.key(coordinates, borehole.r_b, borehole.D, m_flow_borehole,
+                       bhe_object, log_time, fluid, pipe, grout, soil)
+        if key not in self.keys:
+            self.misses += 1
+            return None
+        self.hits += 1
+
+        with np.load(self.path) as data:
+            g_values = data[key]
+        n_heights = len(self.H_values)
+        return dt.gfunction.GFunction.from_values(
+            B, self.H_values.tolist(), [self.r_b] * n_heights,
+            [self.D] * n_heights, g_values.tolist(), self.log_time.tolist(),
+            coordinates)
@@ -0,0 +1,179 @@
+# agent
+# Saturday, October 17, 2026
+
+import ghedt as dt
+import numpy as np
+from scipy.spatial import cKDTree, ConvexHull
+from scipy.spatial.distance import pdist
+try:
+    from scipy.spatial import QhullError
+except ImportError:
+    # QhullError is only exported by scipy.spatial from scipy 1.8
+    from scipy.spatial.qhull import QhullError
+
+
+class GFunctionSurrogate:
+    """
+    A regression model of the g-function of a field, trained from g-functions
+    that have already been computed (e.g. by
+    :func:`ghedt.gfunction.compute_live_g_function`, or read from a
+    :class:`ghedt.gfunction_library.GFunctionLibrary`). It gives an estimate of
+    the g-function of any layout of boreholes (e.g. the fields of
+    :func:`ghedt.domains.polygonal_land_constraint`) at practically no cost,
+    so that a search can rank the fields with it before confirming the
+    selection with live g-functions.
+
+    Each field is described at a height by the descriptors returned by
+    :meth:`descriptors` (the number of boreholes, B/H, the fraction of the
+    boreholes on the perimeter, the fill ratio and the thermal interaction
+    between the boreholes), and the g-function value at each ln(t/ts) is a
+    least squares fit of those descriptors. The borehole radius, burial depth,
+    borehole heat exchanger, flow rate and properties are assumed to be the
+    same as those of the training g-functions.
+
+    Parameters
+    ----------
+    g_functions: list, optional
+        The g-functions (:class:`ghedt.gfunction.GFunction`) to train the
+        model with. Every height of each g-function is one sample. More can
+        be added with :meth:`add`.
+    """
+
+    def __init__(self, g_functions: list = None):
+        self.log_time = None
+        # The descriptors and g-function values of the training samples
+        self.X = []
+        self.Y = []
+        # The regression coefficients, fit when the model is first used
+        self.coefficients = None
+        # The root mean square leave-one-out relative error of the g-function
+        # at each ln(t/ts)
+        self.error = None
+
+        if g_functions is not None:
+            for g_function in g_functions:
+                self.add(g_function)
+
+    @staticmethod
+    def descriptors(coordinates, H) -> np.ndarray:
+        """
+        The descriptors of a field of boreholes at a height.
+
+        Returns
+        -------
+        descriptors: np.ndarray
+            ln(number of boreholes), B/H (with B the mean distance to the
+            nearest borehole), the fraction of the boreholes on the
+            perimeter of the field, the fill ratio (the area taken by the
+            boreholes over the area of the convex hull of the field) and the
+            mean (over the boreholes) of the sum of ln(1 + H/d) over the
+            distances d to the other boreholes.
+        """
+        xy = np.asarray(coordinates, dtype=np.double).reshape(-1, 2)
+        n = len(xy)
+        if n == 1:
+            return np.array([0., 0., 1., 1., 0.])
+
+        tree = cKDTree(xy)
+        k = min(n, 9)
+        distances, neighbours = tree.query(xy, k=k)
+        B = distances[:, 1].mean()
+
+        # A borehole is on the perimeter if there is a gap of more than 135
+        # degrees between the directions to its nearest neighbours
+        n_perimeter = 0
+        for i in range(n):
+            v = xy[neighbours[i, 1:]] - xy[i]
+            angles = np.sort(np.arctan2(v[:, 1], v[:, 0]))
+            gaps = np.diff(np.append(angles, angles[0] + 2. * np.pi))
+            if gaps.max() > 0.75 * np.pi:
+                n_perimeter += 1
+
+        # The area of the field is the convex hull grown by B/2
+        try:
+            hull = ConvexHull(xy)
+            area = hull.volume + hull.area * B / 2. + np.pi * B ** 2 / 4.
+        except QhullError:
+            # The boreholes are on a line
+            area = n * B ** 2
+        fill_ratio = n * B ** 2 / area
+
+        interaction = 2. * np.log1p(H / pdist(xy)).sum() / n
+
+        return np.array([np.log(n), B / H, n_perimeter / n, fill_ratio,
+                         interaction])
+
+    @staticmethod
+    def design_matrix(X) -> np.ndarray:
+        """
+        The terms of the regression for an array of descriptors (one row per
+        sample).
+        """
+        X = np.atleast_2d(X)
+        ln_n, B_over_H, perimeter, fill_ratio, interaction = X.T
+        return np.column_stack(
+            [np.ones(len(X)), ln_n, B_over_H, perimeter, fill_ratio,
+             interaction, np.log1p(interaction), ln_n * interaction,
+             interaction ** 2, perimeter * interaction,
+             fill_ratio * interaction])
+
+    def add(self, g_function) -> None:
+        """
+        Add the g-function of a field (at each of its heights) to the
+        training samples.
+        """
+        log_time = np.asarray(g_function.log_time, dtype=np.double)
+        if self.log_time is None:
+            self.log_time = log_time
+        elif not np.array_equal(self.log_time, log_time):
+            raise ValueError('The g-functions of the surrogate should all have '
+                             'the same ln(t/ts) values.')
+
+        for H, g_values in g_function.g_lts.items():
+            self.X.append(self.descriptors(g_function.bore_locations, H))
+            self.Y.append(np.asarray(g_values, dtype=np.double))
+        self.coefficients = None
+
+    def fit(self) -> None:
+        """
+        Fit the regression to the training samples.
+        """
+        A = self.design_matrix(np.array(self.X))
+        Y = np.array(self.Y)
+        if len(A) < A.shape[1]:
+            raise ValueError('The surrogate needs at least {} g-functions to '
+                             'be trained.'.format(A.shape[1]))
+        # The terms are scaled so that the fit is well conditioned
+        self.scale = np.abs(A).max(axis=0)
+        self.scale[self.scale == 0.] = 1.
+        A = A / self.scale
+        self.coefficients, _, _, _ = np.linalg.lstsq(A, Y, rcond=None)
+
+        # Leave-one-out residuals of the least squares fit
+        leverage = np.einsum('ij,ji->i', A, np.linalg.pinv(A))
+        residuals = (Y - A @ self.coefficients) / \
+            np.maximum(1. - leverage, 1.0e-8)[:, None]
+        self.error = np.sqrt(np.mean((residuals / Y) ** 2, axis=0))
+
+    def predict(self, coordinates, H) -> np.ndarray:
+        """
+        The g-function values of a field at a height, at each ln(t/ts).
+        """
+        if self.coefficients is None:
+            self.fit()
+        A = self.design_matrix(self.descriptors(coordinates, H)) / self.scale
+        return (A @ self.coefficients)[0]
+
+    def g_function(self, B, coordinates, borehole):
+        """
+        The g-function of a field at the height of the borehole.
+
+        Returns
+        -------
+        g_function: ghedt.gfunction.GFunction
+        """
+        H = borehole.H
+        return dt.gfunction.GFunction.from_values(
+            B, [H], [borehole.r_b], [borehole.D],
+            [self.predict(coordinates, H).tolist()], self.log_time.tolist(),
+            coordinates)
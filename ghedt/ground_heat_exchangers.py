@@ -1,10 +1,10 @@
 # Jack C. Cook
 # Thursday, September 16, 2021
-import copy
 import warnings
 
 import scipy.interpolate
 import scipy.optimize
+import scipy.signal
 import pygfunction as gt
 import ghedt.peak_load_analysis_tool as plat
 import ghedt as dt
@@ -20,7 +20,8 @@ class BaseGHE:
             pipe: plat.media.Pipe, grout: plat.media.Grout,
             soil: plat.media.Soil, GFunction: dt.gfunction.GFunction,
             sim_params: plat.media.SimulationParameters,
-            hourly_extraction_ground_loads: list):
+            hourly_extraction_ground_loads: list,
+            sts_time_stepping: str = 'fixed', sts_grid: str = 'uniform'):
 
         self.V_flow_system = V_flow_system
         self.B_spacing = B_spacing
@@ -35,10 +36,15 @@ class BaseGHE:
         # Equivalent borehole Heat Exchanger
         self.bhe_eq = plat.equivalance.compute_equivalent(self.bhe)
 
-        # Radial numerical short time step
+        # Radial numerical short time step, with either a 'fixed' or an
+        # 'adaptive' time step, on a 'uniform' or 'log' spaced radial grid
         self.radial_numerical = \
-            plat.radial_numerical_borehole.RadialNumericalBH(self.bhe_eq)
+            plat.radial_numerical_borehole.RadialNumericalBH(
+                self.bhe_eq, time_stepping=sts_time_stepping, grid=sts_grid)
         self.radial_numerical.calc_sts_g_functions(self.bhe_eq)
+        # The borehole heat exchanger inputs that the equivalent borehole and
+        # the short time step g-function were last computed for
+        self.bhe_signature = self.compute_bhe_signature()
 
         # GFunction object
         self.GFunction = GFunction
@@ -90,24 +96,71 @@ class BaseGHE:
         max_log_time_sts = max(log_time_sts)
         min_log_time_lts = min(log_time_lts)
 
+        # The values may be lists or numpy arrays (e.g. the g-functions loaded
+        # by ghedt.gfunction.load_g_functions), so they are concatenated
         if max_log_time_sts < min_log_time_lts:
-            log_time = log_time_sts + log_time_lts
-            g = g_sts + g_lts
+            log_time = np.concatenate((log_time_sts, log_time_lts))
+            g = np.concatenate((g_sts, g_lts))
         else:
             # find where to stop in sts
             i = 0
             value = log_time_sts[i]
-            while value <= min_log_time_lts:
+            while value < min_log_time_lts:
                 i += 1
                 value = log_time_sts[i]
-            log_time = log_time_sts[0:i] + log_time_lts
-            g = g_sts[0:i] + g_lts
+            log_time = np.concatenate((log_time_sts[0:i], log_time_lts))
+            g = np.concatenate((g_sts[0:i], g_lts))
 
         g = scipy.interpolate.interp1d(log_time, g)
 
         return g
 
-    def grab_g_function(self, B_over_H):
+    def compute_bhe_signature(self) -> tuple:
+        # The inputs that the thermal resistances, the equivalent borehole
+        # heat exchanger and the short time step g-function depend on. Note
+        # that the effective borehole resistance (and therefore all of these)
+        # depends on the height of the borehole.
+        bhe = self.bhe
+        fluid = bhe.fluid
+        pipe = bhe.pipe
+
+        def flatten(value):
+            return tuple(np.ravel(value).tolist())
+
+        signature = (
+            bhe.m_flow_borehole,
+            (fluid.rho, fluid.cp, fluid.mu, fluid.k),
+            (flatten(pipe.pos), flatten(pipe.r_in), flatten(pipe.r_out),
+             pipe.s, pipe.eps, flatten(pipe.k), pipe.rhoCp),
+            (bhe.grout.k, bhe.grout.rhoCp),
+            (bhe.soil.k, bhe.soil.rhoCp),
+            (bhe.b.H, bhe.b.D, bhe.b.r_b))
+
+        return signature
+
+    def update_bhe(self) -> None:
+        # Update the thermal resistances, the equivalent borehole heat
+        # exchanger and the short time step g-function only if the borehole
+        # heat exchanger inputs have changed since they were last computed
+        signature = self.compute_bhe_signature()
+        if signature == self.bhe_signature:
+            return
+
+        self.bhe.update_thermal_resistance()
+        # Solve for equivalent single U-tube
+        self.bhe_eq = plat.equivalance.compute_equivalent(self.bhe)
+        # Update short time step object with equivalent single u-tube
+        self.radial_numerical.calc_sts_g_functions(self.bhe_eq)
+
+        self.bhe_signature = signature
+
+        return
+
+    def grab_g_function(self, B_over_H, radial_numerical=None):
+        # The radial numerical short time step g-function is the one of the
+        # ground heat exchanger unless another one is given
+        if radial_numerical is None:
+            radial_numerical = self.radial_numerical
         # interpolate for the Long time step g-function
         g_function, rb_value, D_value, H_eq = \
             self.GFunction.g_function_interpolation(B_over_H)
@@ -121,8 +174,8 @@ class BaseGHE:
         # combine the short and long time step g-function
         g = self.combine_sts_lts(
             self.GFunction.log_time, g_function_corrected,
-            self.radial_numerical.lntts.tolist(),
-            self.radial_numerical.g.tolist())
+            radial_numerical.lntts.tolist(),
+            radial_numerical.g.tolist())
 
         return g
 
@@ -134,14 +187,103 @@ class BaseGHE:
 
         return T_excess
 
+    @staticmethod
+    def _uniform_time_step(time_values: np.ndarray, superposition: str):
+        # The fft and aggregated superpositions require a uniform time step
+        time_steps = time_values[1:] - time_values[:-1]
+        time_step = time_steps[0]
+        if not np.allclose(time_steps, time_step):
+            raise ValueError('The ' + superposition + ' superposition '
+                             'requires a uniform time step. Use the hourly '
+                             'method.')
+        return time_step
+
     def _simulate_detailed(self, Q_dot: np.ndarray, time_values: np.ndarray,
-                           g: scipy.interpolate.interp1d):
+                           g: scipy.interpolate.interp1d,
+                           superposition: str = 'direct',
+                           cells_per_level: int = 5, block_sizes: list = None,
+                           early_exit: bool = False):
         # Perform a detailed simulation based on a numpy array of heat rejection
         # rates, Q_dot (Watts) where each load is applied at the time_value
         # (seconds). The g-function can interpolated.
+        # With early_exit, the simulation is performed one year at a time and
+        # stops at the end of the first year in which the heat pump entering
+        # fluid temperature leaves the allowable range. The index of the first
+        # time step outside of the range is stored in violation_step.
+        ts = self.radial_numerical.t_s  # (-)
+        H = self.bhe.b.H  # (meters)
+        Rb = self.bhe.compute_effective_borehole_resistance()  # (m.K/W)
+
+        chunk_stops = None
+        if early_exit:
+            # Check the temperatures at the end of every year
+            years = np.arange(8760., time_values[-1], 8760.)
+            chunk_stops = \
+                np.searchsorted(time_values, years, side='right').tolist()
+
+        HPEFT = []
+        delta_Tb = []
+        self.violation_step = None
+        for HPEFT_chunk, delta_Tb_chunk in self._simulate_detailed_chunks(
+                Q_dot, time_values, [g], [H], [ts], [Rb],
+                superposition=superposition, cells_per_level=cells_per_level,
+                block_sizes=block_sizes, chunk_stops=chunk_stops):
+            if early_exit:
+                violations = np.flatnonzero(
+                    (HPEFT_chunk[0] > self.sim_params.max_EFT_allowable) |
+                    (HPEFT_chunk[0] < self.sim_params.min_EFT_allowable))
+                if violations.size > 0:
+                    self.violation_step = len(HPEFT) + int(violations[0])
+            HPEFT += HPEFT_chunk[0].tolist()
+            delta_Tb += delta_Tb_chunk[0].tolist()
+            if self.violation_step is not None:
+                break
+
+        return HPEFT, delta_Tb
+
+    def _simulate_detailed_many(
+            self, Q_dot: np.ndarray, time_values: np.ndarray, g_functions: list,
+            H_values: list, t_s_values: list, Rb_values: list,
+            superposition: str = 'direct', cells_per_level: int = 5,
+            block_sizes: list = None):
+        # Perform the detailed simulation for multiple heights at once. The
+        # rows of the returned heat pump entering fluid temperatures and
+        # borehole wall temperature changes correspond to the heights.
+        HPEFT, delta_Tb = next(self._simulate_detailed_chunks(
+            Q_dot, time_values, g_functions, H_values, t_s_values, Rb_values,
+            superposition=superposition, cells_per_level=cells_per_level,
+            block_sizes=block_sizes))
+
+        return HPEFT, delta_Tb
+
+    def _simulate_detailed_chunks(
+            self, Q_dot: np.ndarray, time_values: np.ndarray, g_functions: list,
+            H_values: list, t_s_values: list, Rb_values: list,
+            superposition: str = 'direct', cells_per_level: int = 5,
+            block_sizes: list = None, chunk_stops: list = None):
+        # Perform the detailed simulation for multiple heights at once, and
+        # yield the heat pump entering fluid temperatures and borehole wall
+        # temperature changes for consecutive chunks of time steps. Each chunk
+        # ends (exclusive) at the next index in chunk_stops, and the last chunk
+        # ends at the last time step. The g-function, the characteristic time
+        # (ts) and the effective borehole resistance are given for each
+        # height, and the rows of the yielded arrays correspond to the heights.
         # Source: Chapter 2 of Advances in Ground Source Heat Pumps
+        # The temporal superposition is either performed directly over the
+        # whole load history ('direct'), or with multi-level load aggregation
+        # ('aggregated', see dt.load_aggregation). The aggregation
+        # requires a uniform time step, and is controlled by the number of
+        # cells per level and the cell width (block size) of each level.
+        # On a uniform time step the direct superposition is a discrete
+        # convolution of the load steps with the g-function, which 'fft'
+        # computes exactly (to round-off) with a fast Fourier transform.
 
         n = Q_dot.size
+        m = len(g_functions)
+
+        if chunk_stops is None:
+            chunk_stops = []
+        chunk_stops = [stop for stop in chunk_stops if 0 < stop < n] + [n]
 
         # Convert the total load applied to the field to the average over
         # borehole wall rejection rate
@@ -151,37 +293,113 @@ class BaseGHE:
 
         Q_dot_b_dt = np.hstack((Q_dot_b[1:] - Q_dot_b[:-1]))
 
-        ts = self.radial_numerical.t_s  # (-)
+        # The height dependent values are columns so they broadcast over time
+        H = np.array(H_values, dtype=np.double)[:, None]  # (meters)
+        Rb = np.array(Rb_values, dtype=np.double)[:, None]  # (m.K/W)
         two_pi_k = 2. * np.pi * self.bhe.soil.k  # (W/m.K)
-        H = self.bhe.b.H  # (meters)
+
+        def g_values_at(_time):
+            # Evaluate the g-function of each height at the times (hours)
+            g_values = np.zeros((m, _time.size))
+            for j in range(m):
+                g_values[j] = g_functions[j](
+                    np.log((_time * 3600.) / t_s_values[j]))
+            return g_values
+
+        # Prepare the g-function values that are shared by all of the chunks
+        if superposition == 'direct':
+            # The g-function is evaluated only once for each distinct time
+            # difference (t_i - t_j) and reused at every time step
+            time_steps = time_values[1:] - time_values[:-1]
+            uniform = np.allclose(time_steps, time_steps[0])
+            if uniform:
+                # On a uniform time step, the time difference only depends
+                # on the lag (i - j)
+                _time = time_values[1:] - time_values[0]
+                g_values = g_values_at(_time)
+            else:
+                # Row i-1 of the lower triangle holds t_i - t_j for j < i. The
+                # lower triangle is stored row by row, so that rows a to b-1
+                # are the elements a(a+1)/2 to b(b+1)/2.
+                _time = time_values[1:, None] - time_values[None, 0:n]
+                lower = np.tril_indices(n)
+                unique_time, inverse = np.unique(
+                    _time[lower], return_inverse=True)
+                g_values = g_values_at(unique_time)
+        elif superposition == 'fft':
+            time_step = self._uniform_time_step(time_values, superposition)
+            # The g-function at each lag (i - j) of the uniform time step
+            _time = np.arange(1, n + 1) * time_step
+            g_values = g_values_at(_time)
+        elif superposition == 'aggregated':
+            time_step = self._uniform_time_step(time_values, superposition)
+            aggregation = dt.load_aggregation.MultiLevelAggregation(
+                n, cells_per_level=cells_per_level, block_sizes=block_sizes)
+            _time = aggregation.get_times_for_simulation() * time_step
+            g_values = g_values_at(_time)
+            aggregation.initialize(g_values / H / two_pi_k)
+        else:
+            raise ValueError('Only direct, fft or aggregated superposition is '
+                             'available.')
+
+        a = 0
+        for b in chunk_stops:
+            # Tb = Tg + (q_dt * g)  (Equation 2.12)
+            if superposition == 'direct' and uniform:
+                delta_Tb = np.zeros((m, b - a))
+                for i in range(a+1, b+1):
+                    delta_Tb[:, i-1-a] = \
+                        g_values[:, i-1::-1].dot(Q_dot_b_dt[0:i])
+                delta_Tb /= H * two_pi_k
+            elif superposition == 'direct':
+                start = a * (a + 1) // 2
+                stop = b * (b + 1) // 2
+                rows = lower[0][start:stop] - a
+                columns = lower[1][start:stop]
+                delta_Tb = np.zeros((m, b - a))
+                g_matrix = np.zeros((b - a, n))
+                for j in range(m):
+                    g_matrix[rows, columns] = g_values[j, inverse[start:stop]]
+                    delta_Tb[j] = g_matrix.dot(Q_dot_b_dt)
+                delta_Tb /= H * two_pi_k
+            elif superposition == 'fft':
+                delta_Tb = scipy.signal.fftconvolve(
+                    Q_dot_b_dt[None, 0:b], g_values[:, 0:b], axes=1)[:, a:b]
+                delta_Tb /= H * two_pi_k
+            else:
+                delta_Tb = aggregation.simulate(Q_dot_b[1:b+1], start=a)
+
+            Tf_out = self._fluid_temperature(
+                delta_Tb, Q_dot_b[a+1:b+1], H, Rb)
+
+            yield Tf_out, delta_Tb
+
+            a = b
+
+    def _fluid_temperature(self, delta_Tb, Q_dot_b, H, Rb):
+        # The heat pump entering fluid temperature given the borehole wall
+        # temperature change and the heat rejection rate per borehole (W)
         Tg = self.bhe.soil.ugt  # (Celsius)
-        Rb = self.bhe.compute_effective_borehole_resistance()  # (m.K/W)
         m_dot = self.bhe.m_flow_borehole  # (kg/s)
         cp = self.bhe.fluid.cp  # (J/kg.s)
 
-        HPEFT = []
-        delta_Tb = []
-        for i in range(1, n+1):
-            # Take the last i elements of the reversed time array
-            _time = time_values[i] - time_values[0:i]
-            # _time = time_values_reversed[n - i:n]
-            g_values = g(np.log((_time * 3600.) / ts))
-            # Tb = Tg + (q_dt * g)  (Equation 2.12)
-            delta_Tb_i = (Q_dot_b_dt[0:i] / H / two_pi_k).dot(g_values)
-            # Tf = Tb + q_i * R_b^* (Equation 2.13)
-            Tb = Tg + delta_Tb_i
-            # Bulk fluid temperature
-            Tf_bulk = Tb + Q_dot_b[i] / H * Rb
-            # T_out = T_f - Q / (2 * mdot cp)  (Equation 2.14)
-            Tf_out = Tf_bulk - Q_dot_b[i] / (2 * m_dot * cp)
-            HPEFT.append(Tf_out)
-            delta_Tb.append(delta_Tb_i)
+        Tb = Tg + delta_Tb
+        # Tf = Tb + q_i * R_b^* (Equation 2.13)
+        # Bulk fluid temperature
+        Tf_bulk = Tb + Q_dot_b / H * Rb
+        # T_out = T_f - Q / (2 * mdot cp)  (Equation 2.14)
+        Tf_out = Tf_bulk - Q_dot_b / (2 * m_dot * cp)
 
-        return HPEFT, delta_Tb
+        return Tf_out
 
-    def compute_g_functions(self):
+    def compute_g_functions(self, cache=None, n_workers=1,
+                            response_factors=None):
         # Compute g-functions for a bracketed solution, based on min and max
-        # height
+        # height. The g-functions are loaded from (and stored in) the
+        # optional ghedt.gfunction_cache.GFunctionCache. The three heights are
+        # independent, and are computed at the same time in separate
+        # processes when n_workers is greater than 1. The FLS response factors
+        # are reused from the optional ghedt.gfunction.ResponseFactorCache.
         min_height = self.sim_params.min_Height
         max_height = self.sim_params.max_Height
         avg_height = (min_height + max_height) / 2.
@@ -196,7 +414,8 @@ class BaseGHE:
             self.B_spacing, H_values, r_b_values, D_values,
             self.bhe.m_flow_borehole, self.bhe_object, log_time,
             coordinates, self.bhe.fluid, self.bhe.pipe,
-            self.bhe.grout, self.bhe.soil)
+            self.bhe.grout, self.bhe.soil, cache=cache, n_workers=n_workers,
+            response_factors=response_factors)
 
         self.GFunction = g_function
 
@@ -211,14 +430,19 @@ class GHE(BaseGHE):
                  soil: plat.media.Soil,
                  GFunction: dt.gfunction.GFunction,
                  sim_params: plat.media.SimulationParameters,
-                 hourly_extraction_ground_loads: list
+                 hourly_extraction_ground_loads: list,
+                 sts_time_stepping: str = 'fixed', sts_grid: str = 'uniform'
                  ):
         BaseGHE.__init__(
             self, V_flow_system, B_spacing, bhe_object, fluid, borehole, pipe,
-            grout, soil, GFunction, sim_params, hourly_extraction_ground_loads)
+            grout, soil, GFunction, sim_params, hourly_extraction_ground_loads,
+            sts_time_stepping=sts_time_stepping, sts_grid=sts_grid)
 
         # Split the extraction loads into heating and cooling for input to
-        # the HybridLoad object
+        # the HybridLoad object. The hourly loads are either a single year
+        # that is repeated, or a whole number of years of loads that differ
+        # from year to year (which can be a memory mapped numpy array, e.g.
+        # np.load('loads.npy', mmap_mode='r')).
         hourly_rejection_loads, hourly_extraction_loads = \
             plat.ground_loads.HybridLoad.split_heat_and_cool(
                 self.hourly_extraction_ground_loads)
@@ -234,6 +458,9 @@ class GHE(BaseGHE):
         self.HPEFT = []
         # list of change in borehole wall temperatures
         self.dTb = []
+        # The first time step at which the heat pump entering fluid
+        # temperature left the allowable range in an early exit simulation
+        self.violation_step = None
 
     def __repr__(self):
         output = BaseGHE.__repr__(self)
@@ -282,40 +509,50 @@ class GHE(BaseGHE):
                       str(round(g_values[i], 4)) + '\n'
         return output
 
-    def simulate(self, method='hybrid'):
-        B = self.B_spacing
-        B_over_H = B / self.bhe.b.H
-
-        self.bhe.update_thermal_resistance()
-
-        # Solve for equivalent single U-tube
-        self.bhe_eq = plat.equivalance.compute_equivalent(self.bhe)
-        # Update short time step object with equivalent single u-tube
-        self.radial_numerical.calc_sts_g_functions(self.bhe_eq)
-        # Combine the short and long-term g-functions. The long term g-function
-        # is interpolated for specific B/H and rb/H values.
-        g = self.grab_g_function(B_over_H)
-
+    def _load_history(self, method='hybrid'):
+        # The heat rejection rates (Watts) applied to the field and the times
+        # (hours) they are applied at for the hybrid or hourly method
         if method == 'hybrid':
             Q_dot = self.hybrid_load.load[2:] * 1000.  # convert to Watts
             time_values = self.hybrid_load.hour[2:]  # convert to seconds
-
-            HPEFT, dTb = self._simulate_detailed(Q_dot, time_values, g)
         elif method == 'hourly':
             n_months = \
                 self.sim_params.end_month - self.sim_params.start_month + 1
             n_hours = int(n_months / 12. * 8760.)
-            Q_dot = copy.deepcopy(self.hourly_extraction_ground_loads)
+            # The loads may be one year or several years of hourly loads,
+            # and are only repeated if they are shorter than the simulation
+            Q_dot = np.asarray(
+                self.hourly_extraction_ground_loads, dtype=np.double)
             # How many times does q need to be repeated?
-            n_years = int(np.ceil(n_hours / 8760))
-            Q_dot = Q_dot * n_years
-            Q_dot = -1. * np.array(Q_dot)  # Convert loads to rejection
-            t = np.arange(1, n_hours + 1, 1)
-
-            HPEFT, dTb = self._simulate_detailed(Q_dot, t, g)
+            n_years = int(np.ceil(n_hours / Q_dot.size))
+            if n_years > 1:
+                Q_dot = np.tile(Q_dot, n_years)
+            Q_dot = -1. * Q_dot[0:n_hours]  # Convert loads to rejection
+            time_values = np.arange(1, n_hours + 1, 1)
         else:
             raise ValueError('Only hybrid or hourly methods available.')
 
+        return Q_dot, time_values
+
+    def simulate(self, method='hybrid', superposition='direct',
+                 cells_per_level=5, block_sizes=None, early_exit=False):
+        B = self.B_spacing
+        B_over_H = B / self.bhe.b.H
+
+        # Update the equivalent single U-tube and the short time step
+        # g-function if the borehole heat exchanger has changed
+        self.update_bhe()
+        # Combine the short and long-term g-functions. The long term g-function
+        # is interpolated for specific B/H and rb/H values.
+        g = self.grab_g_function(B_over_H)
+
+        Q_dot, time_values = self._load_history(method=method)
+
+        HPEFT, dTb = self._simulate_detailed(
+            Q_dot, time_values, g, superposition=superposition,
+            cells_per_level=cells_per_level, block_sizes=block_sizes,
+            early_exit=early_exit)
+
         self.HPEFT = HPEFT
         self.dTb = dTb
 
@@ -323,23 +560,170 @@ class GHE(BaseGHE):
         min_HP_EFT = float(min(HPEFT))
         return max_HP_EFT, min_HP_EFT
 
-    def size(self, method='hybrid') -> None:
-        # Size the ground heat exchanger
+    def max_load_scale(self, method='hybrid', superposition='direct',
+                       cells_per_level=5, block_sizes=None) -> float:
+        # The largest factor that the ground loads can be multiplied by
+        # without the heat pump entering fluid temperature leaving the
+        # allowable range. The change in the fluid temperature from the
+        # undisturbed ground temperature is linear in the loads, so the
+        # factor follows from a single simulation.
+        self.simulate(method=method, superposition=superposition,
+                      cells_per_level=cells_per_level, block_sizes=block_sizes)
+
+        Tg = self.bhe.soil.ugt  # (Celsius)
+        max_EFT = self.sim_params.max_EFT_allowable
+        min_EFT = self.sim_params.min_EFT_allowable
+        if not min_EFT <= Tg <= max_EFT:
+            raise ValueError('The undisturbed ground temperature is outside '
+                             'of the allowable fluid temperature range.')
+
+        # The fluid temperature change for the current loads
+        delta_T = np.array(self.HPEFT) - Tg
+        above = delta_T > 0.
+        below = delta_T < 0.
+        scales = np.hstack(((max_EFT - Tg) / delta_T[above],
+                            (min_EFT - Tg) / delta_T[below]))
+        if scales.size == 0:
+            return np.inf
+
+        return float(scales.min())
+
+    def simulate_hourly_chunks(self, chunk_size=8760, cells_per_level=5,
+                               block_sizes=None):
+        # Simulate the hourly loads over the simulation period and yield the
+        # heat pump entering fluid temperatures in numpy arrays of chunk_size
+        # hours (the last chunk may be shorter). The hourly loads (one year or
+        # several years) are repeated if they are shorter than the simulation
+        # and superimposed with the aggregated superposition, which
+        # only needs the cumulative load at the edges of the aggregation
+        # cells, so the memory used does not grow with the simulation period.
+        B_over_H = self.B_spacing / self.bhe.b.H
+
+        self.update_bhe()
+        g = self.grab_g_function(B_over_H)
+
+        n_months = self.sim_params.end_month - self.sim_params.start_month + 1
+        n_hours = int(n_months / 12. * 8760.)
+
+        # Convert the extraction loads (W) to the heat rejection rate per
+        # borehole (W)
+        loads = dt.load_aggregation.RepeatedLoad(
+            -1. * np.asarray(self.hourly_extraction_ground_loads,
+                             dtype=np.double) / float(self.nbh))
+
+        ts = self.radial_numerical.t_s  # (-)
+        two_pi_k = 2. * np.pi * self.bhe.soil.k  # (W/m.K)
+        H = self.bhe.b.H  # (meters)
+        Rb = self.bhe.compute_effective_borehole_resistance()  # (m.K/W)
+
+        aggregation = dt.load_aggregation.MultiLevelAggregation(
+            n_hours, cells_per_level=cells_per_level, block_sizes=block_sizes)
+        _time = aggregation.get_times_for_simulation()  # (hours)
+        g_values = g(np.log((_time * 3600.) / ts))
+        aggregation.initialize(g_values / H / two_pi_k)
+
+        for a in range(0, n_hours, chunk_size):
+            b = min(a + chunk_size, n_hours)
+            # Tb = Tg + (q_dt * g)  (Equation 2.12)
+            delta_Tb = aggregation.simulate_cumulative(
+                loads.cumulative_load, a, b)
+            yield self._fluid_temperature(
+                delta_Tb, loads.load(np.arange(a, b)), H, Rb)
+
+    def simulate_many(self, H_values, method='hybrid', superposition='direct',
+                      cells_per_level=5, block_sizes=None) -> np.ndarray:
+        # The excess fluid temperature (see cost) of the ground heat exchanger
+        # at each of the heights in H_values. The load history and the time
+        # differences it is superimposed over are shared by all of the
+        # heights, which are simulated in one pass. The equivalent borehole
+        # heat exchanger and the short time step g-function are computed for
+        # each height on copies, so the ground heat exchanger is not changed.
+        radial_numerical = self.radial_numerical
+        borehole = self.bhe.b
+
+        g_functions = []
+        t_s_values = []
+        Rb_values = []
+        for H in H_values:
+            bhe = self.bhe_object(
+                self.bhe.m_flow_borehole, self.bhe.fluid,
+                gt.boreholes.Borehole(H, borehole.D, borehole.r_b,
+                                      x=borehole.x, y=borehole.y),
+                self.bhe.pipe, self.bhe.grout, self.bhe.soil)
+            bhe_eq = plat.equivalance.compute_equivalent(bhe)
+            radial_numerical_H = \
+                plat.radial_numerical_borehole.RadialNumericalBH(
+                    bhe_eq, ground_init_temp=radial_numerical.init_temp,
+                    dtype=radial_numerical.dtype,
+                    time_stepping=radial_numerical.time_stepping,
+                    grid=radial_numerical.grid,
+                    num_grout_cells=radial_numerical.num_grout_cells,
+                    num_soil_cells=radial_numerical.num_soil_cells,
+                    far_field_radius=radial_numerical.far_field_radius,
+                    cache=radial_numerical.cache)
+            radial_numerical_H.calc_sts_g_functions(bhe_eq)
+            g_functions.append(self.grab_g_function(
+                self.B_spacing / H, radial_numerical=radial_numerical_H))
+            t_s_values.append(radial_numerical_H.t_s)
+            Rb_values.append(bhe.compute_effective_borehole_resistance())
+
+        Q_dot, time_values = self._load_history(method=method)
+
+        HPEFT, dTb = self._simulate_detailed_many(
+            Q_dot, time_values, g_functions, H_values, t_s_values, Rb_values,
+            superposition=superposition, cells_per_level=cells_per_level,
+            block_sizes=block_sizes)
+
+        delta_T_max = HPEFT.max(axis=1) - self.sim_params.max_EFT_allowable
+        delta_T_min = self.sim_params.min_EFT_allowable - HPEFT.min(axis=1)
+        T_excess = np.maximum(delta_T_max, delta_T_min)
+
+        return T_excess
+
+    def size(self, method='hybrid', superposition='direct', cells_per_level=5,
+             block_sizes=None, n_bracket=2) -> None:
+        # Size the ground heat exchanger. The excess temperature is first
+        # computed on n_bracket evenly spaced heights from the minimum to the
+        # maximum height in one call to simulate_many, and the height is then
+        # solved for between the two heights where the excess temperature
+        # changes sign. Each height needs its own short time step g-function,
+        # so more bracketing heights only save a few of the brentq iterations.
+        min_height = self.sim_params.min_Height
+        max_height = self.sim_params.max_Height
+        H_values = np.linspace(min_height, max_height, n_bracket).tolist()
+        T_excess = self.simulate_many(
+            H_values, method=method, superposition=superposition,
+            cells_per_level=cells_per_level, block_sizes=block_sizes)
 
         def local_objective(H):
             self.bhe.b.H = H
-            max_HP_EFT, min_HP_EFT = self.simulate(method=method)
+            max_HP_EFT, min_HP_EFT = self.simulate(
+                method=method, superposition=superposition,
+                cells_per_level=cells_per_level, block_sizes=block_sizes)
             T_excess = self.cost(max_HP_EFT, min_HP_EFT)
             return T_excess
 
-        # Make the initial guess variable the average of the heights given
-        self.bhe.b.H = \
-            (self.sim_params.max_Height + self.sim_params.min_Height) / 2.
-        # bhe.b.H is updated during sizing
-        plat.equivalance.solve_root(
-            self.bhe.b.H, local_objective, lower=self.sim_params.min_Height,
-            upper=self.sim_params.max_Height, xtol=1.0e-6, rtol=1.0e-6,
-            maxiter=50)
+        signs = np.sign(T_excess)
+        brackets = np.flatnonzero(signs[:-1] != signs[1:])
+        if brackets.size > 0:
+            i = brackets[0]
+            lower, upper = H_values[i], H_values[i + 1]
+
+            # The bracketing heights have already been simulated
+            def bracketed_objective(H):
+                if H == lower:
+                    return T_excess[i]
+                elif H == upper:
+                    return T_excess[i + 1]
+                return local_objective(H)
+
+            # bhe.b.H is updated during sizing
+            plat.equivalance.solve_root(
+                (lower + upper) / 2., bracketed_objective, lower=lower,
+                upper=upper, xtol=1.0e-6, rtol=1.0e-6, maxiter=50)
+        else:
+            # The root is not bracketed, so the maximum height is taken
+            local_objective(max_height)
         if self.bhe.b.H == self.sim_params.min_Height:
             warnings.warn('The minimum height provided to size this ground heat'
                           ' exchanger is not shallow enough. Provide a '
@@ -352,3 +736,70 @@ class GHE(BaseGHE):
                           'exchanger.')
 
         return
+
+
+class ResponseOperator:
+    def __init__(self, ghe: GHE):
+        # The hourly heat pump entering fluid temperature of a ground heat
+        # exchanger is the undisturbed ground temperature plus a linear
+        # function of the hourly loads. This object stores that linear
+        # function for the current field and height, so that it can be
+        # applied to many hourly load profiles at once without re-running the
+        # ground heat exchanger simulation for each of them. The loads are
+        # repeated over the simulation period of the ground heat exchanger,
+        # and the temporal superposition is the exact fft convolution.
+        ghe.update_bhe()
+        g = ghe.grab_g_function(ghe.B_spacing / ghe.bhe.b.H)
+
+        n_months = \
+            ghe.sim_params.end_month - ghe.sim_params.start_month + 1
+        self.n_hours = int(n_months / 12. * 8760.)
+        self.nbh = ghe.nbh
+
+        ts = ghe.radial_numerical.t_s  # (-)
+        two_pi_k = 2. * np.pi * ghe.bhe.soil.k  # (W/m.K)
+        H = ghe.bhe.b.H  # (meters)
+        Rb = ghe.bhe.compute_effective_borehole_resistance()  # (m.K/W)
+        m_dot = ghe.bhe.m_flow_borehole  # (kg/s)
+        cp = ghe.bhe.fluid.cp  # (J/kg.s)
+
+        self.Tg = ghe.bhe.soil.ugt  # (Celsius)
+        # The borehole wall temperature change for a unit step in the heat
+        # rejection rate per borehole at each hour after the step
+        _time = np.arange(1, self.n_hours + 1, 1)
+        self.g_values = g(np.log((_time * 3600.) / ts)) / H / two_pi_k
+        # The difference between the heat pump entering fluid temperature and
+        # the borehole wall temperature for a unit heat rejection rate per
+        # borehole (Equations 2.13 and 2.14)
+        self.R_fluid = Rb / H - 1. / (2 * m_dot * cp)
+
+    def apply(self, hourly_extraction_ground_loads) -> np.ndarray:
+        # Compute the hourly heat pump entering fluid temperatures for one
+        # profile of hourly ground extraction loads (W) covering one or more
+        # years, or for multiple profiles given as the rows of a 2D array.
+        # The rows of the returned array correspond to the rows of the loads.
+        loads = np.asarray(hourly_extraction_ground_loads, dtype=np.double)
+        Q_extraction = np.atleast_2d(loads)
+
+        n = self.n_hours
+        # How many times does q need to be repeated?
+        n_years = int(np.ceil(n / Q_extraction.shape[1]))
+        # Convert the loads to the heat rejection rate per borehole
+        Q_dot_b = \
+            -1. * np.tile(Q_extraction, (1, n_years))[:, 0:n] / self.nbh
+        Q_dot_b_dt = np.diff(Q_dot_b, axis=1, prepend=0.)
+
+        # Tb = Tg + (q_dt * g)  (Equation 2.12)
+        delta_Tb = scipy.signal.fftconvolve(
+            Q_dot_b_dt, self.g_values[None, :], axes=1)[:, 0:n]
+        HPEFT = self.Tg + delta_Tb + Q_dot_b * self.R_fluid
+
+        if loads.ndim == 1:
+            return HPEFT[0]
+        return HPEFT
+
+    def extreme_temperatures(self, hourly_extraction_ground_loads):
+        # The maximum and minimum heat pump entering fluid temperature for
+        # each of the load profiles
+        HPEFT = self.apply(hourly_extraction_ground_loads)
+        return HPEFT.max(axis=-1), HPEFT.min(axis=-1)
@@ -45,9 +45,17 @@ def solve_root(x, objective_function, lower=None, upper=None,
     kg_minus_sign = int(minus / abs(minus))
     kg_plus_sign = int(plus / abs(plus))
 
+    # brentq begins by evaluating the bounds, which have already been computed
+    def bounded_objective_function(_x):
+        if _x == lower:
+            return minus
+        elif _x == upper:
+            return plus
+        return objective_function(_x)
+
     # Solve the root if we can, if not, take the higher value
     if kg_plus_sign != kg_minus_sign:
-        x = brentq(objective_function, lower, upper,
+        x = brentq(bounded_objective_function, lower, upper,
                    xtol=xtol, rtol=rtol, maxiter=maxiter)
     elif kg_plus_sign == -1 and kg_minus_sign == -1:
         x = upper
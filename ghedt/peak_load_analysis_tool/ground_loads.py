@@ -122,14 +122,19 @@ def create_synthetic_doubling_load_profile(units='W', year=2019) -> tuple:
 
 class HybridLoad:
     def __init__(self,
-                 hourly_rejection_loads: list, hourly_extraction_loads: list,
+                 hourly_rejection_loads, hourly_extraction_loads,
                  bhe: plat.borehole_heat_exchangers.SingleUTube,
                  radial_numerical: plat.radial_numerical_borehole.RadialNumericalBH,
                  sim_params: plat.media.SimulationParameters,
                  COP_rejection=None, COP_extraction=None, year=2019):
-        # Split the hourly loads into heating and cooling (kW)
-        self.hourly_rejection_loads = hourly_rejection_loads
-        self.hourly_extraction_loads = hourly_extraction_loads
+        # Split the hourly loads into heating and cooling (kW). The loads may
+        # be one year of hourly loads, or several consecutive years of hourly
+        # loads (such as a memory mapped numpy array) that differ from year to
+        # year.
+        self.hourly_rejection_loads = \
+            np.asarray(hourly_rejection_loads, dtype=np.double)
+        self.hourly_extraction_loads = \
+            np.asarray(hourly_extraction_loads, dtype=np.double)
 
         # Store the borehole heat exchanger
         self.bhe = bhe
@@ -146,38 +151,44 @@ class HybridLoad:
         else:
             self.COP_rejection = COP_rejection
 
-        # Get the number of days in each month for a given year (make 0 NULL)
-        self.days_in_month = \
-            [0] + [monthrange(year, i)[1] for i in range(1, 13)]
-        assert len(hourly_rejection_loads) == sum(self.days_in_month) * 24. \
-               and len(hourly_extraction_loads) == \
-               sum(self.days_in_month) * 24., "The total number of hours in " \
-                                              "the year are not equal. Is " \
-                                              "this a leap year?"
+        # Get the number of days in each month for a given year
+        days_in_year_months = [monthrange(year, i)[1] for i in range(1, 13)]
+        hours_in_year = sum(days_in_year_months) * 24
+        n_hours = self.hourly_rejection_loads.size
+        assert n_hours == self.hourly_extraction_loads.size and \
+               n_hours > 0 and n_hours % hours_in_year == 0, \
+               "The total number of hours are not a whole number of years. " \
+               "Is this a leap year?"
+        # The number of years of loads provided
+        self.n_years = n_hours // hours_in_year
+        # The number of days in each month of the loads provided (make 0 NULL)
+        self.days_in_month = [0] + days_in_year_months * self.n_years
 
         # This block of data holds the compact monthly representation of the
         # loads. The intention is that these loads will usually repeat. It's
         # possible that for validation or design purposes, users may wish to
         # specify loads that differ from year to year. For these arrays,
-        # January is the second item (1) and December the last (12)
+        # January of the first year is the second item (1), and the months of
+        # the following years (if provided) continue from there (13, 14, ...)
         # We'll reserve the first item (0) for an annual total or peak
+        n_months = len(self.days_in_month)
 
         # monthly cooling loads (or heat rejection) in kWh
-        self.monthly_cl = [0] * 13
+        self.monthly_cl = [0] * n_months
         # monthly heating loads (or heat extraction) in kWh
-        self.monthly_hl = [0] * 13
+        self.monthly_hl = [0] * n_months
         # monthly peak cooling load (or heat rejection) in kW
-        self.monthly_peak_cl = [0] * 13
+        self.monthly_peak_cl = [0] * n_months
         # monthly peak heating load (or heat extraction) in kW
-        self.monthly_peak_hl = [0] * 13
+        self.monthly_peak_hl = [0] * n_months
         # monthly average cooling load (or heat rejection) in kW
-        self.monthly_avg_cl = [0] * 13
+        self.monthly_avg_cl = [0] * n_months
         # monthly average heating load (or heat extraction) in kW
-        self.monthly_avg_hl = [0] * 13
+        self.monthly_avg_hl = [0] * n_months
         # day of the month on which peak clg load occurs (e.g. 1-31)
-        self.monthly_peak_cl_day = [0] * 13
+        self.monthly_peak_cl_day = [0] * n_months
         # day of the month on which peak htg load occurs (e.g. 1-31)
-        self.monthly_peak_hl_day = [0] * 13
+        self.monthly_peak_hl_day = [0] * n_months
         # Process the loads by month
         self.split_loads_by_month()
 
@@ -205,9 +216,9 @@ class HybridLoad:
         self.two_day_fluid_temps_hl_pk = [[0]]
 
         # duration of monthly peak clg load in hours
-        self.monthly_peak_cl_duration = [0] * 13
+        self.monthly_peak_cl_duration = [0] * n_months
         # duration of monthly peak htg load in hours
-        self.monthly_peak_hl_duration = [0] * 13
+        self.monthly_peak_hl_duration = [0] * n_months
         self.find_peak_durations()
 
         # Simulation start and end month
@@ -239,14 +250,11 @@ class HybridLoad:
          cooling is negative.
          :return: Loads split into heating and cooling
          """
-        # Expects hourly_heat_extraction to be in Watts
-
-        # Heat rejection in the ground occurs when buildings are in cooling
-        # mode, these loads appear negative on Ground extraction loads plots
-        hourly_rejection_loads: list = [0.] * len(hourly_heat_extraction)
-        # Heat extraction in the ground occurs when buildings are in heating
-        # mode, these loads appear positive on Ground extraction load plots
-        hourly_extraction_loads: list = [0.] * len(hourly_heat_extraction)
+        # Expects hourly_heat_extraction to be in Watts. The loads can be a
+        # list, a numpy array or a memory mapped numpy array (np.load with
+        # mmap_mode='r'), and are returned as numpy arrays.
+        hourly_heat_extraction = \
+            np.asarray(hourly_heat_extraction, dtype=np.double)
 
         if units == 'W':
             scale = 1000.
@@ -255,13 +263,16 @@ class HybridLoad:
         else:
             raise ValueError('Units provided are not an option.')
 
-        for i, l_hour in enumerate(hourly_heat_extraction):
-            if l_hour >= 0.0:
-                # Heat is extracted from ground when > 0
-                hourly_extraction_loads[i] = l_hour / scale
-            else:
-                # Heat is rejected to ground when < 0
-                hourly_rejection_loads[i] = l_hour / -scale
+        # Heat is extracted from ground when > 0
+        extraction = hourly_heat_extraction >= 0.0
+        # Heat rejection in the ground occurs when buildings are in cooling
+        # mode, these loads appear negative on Ground extraction loads plots
+        hourly_rejection_loads = \
+            np.where(extraction, 0., hourly_heat_extraction / -scale)
+        # Heat extraction in the ground occurs when buildings are in heating
+        # mode, these loads appear positive on Ground extraction load plots
+        hourly_extraction_loads = \
+            np.where(extraction, hourly_heat_extraction / scale, 0.)
 
         return hourly_rejection_loads, hourly_extraction_loads
 
@@ -286,15 +297,15 @@ class HybridLoad:
 
             # Sum
             # monthly cooling loads (or heat rejection) in kWh
-            self.monthly_cl[i] = sum(month_rejection_loads)
+            self.monthly_cl[i] = float(month_rejection_loads.sum())
             # monthly heating loads (or heat extraction) in kWh
-            self.monthly_hl[i] = sum(month_extraction_loads)
+            self.monthly_hl[i] = float(month_extraction_loads.sum())
 
             # Peak
             # monthly peak cooling load (or heat rejection) in kW
-            self.monthly_peak_cl[i] = max(month_rejection_loads)
+            self.monthly_peak_cl[i] = float(month_rejection_loads.max())
             # monthly peak heating load (or heat extraction) in kW
-            self.monthly_peak_hl[i] = max(month_extraction_loads)
+            self.monthly_peak_hl[i] = float(month_extraction_loads.max())
 
             # Average
             # monthly average cooling load (or heat rejection) in kW
@@ -307,12 +318,12 @@ class HybridLoad:
             # Day of month the peak heating load occurs
             # day of the month on which peak clg load occurs (e.g. 1-31)
             self.monthly_peak_cl_day[i] = \
-                math.floor(month_rejection_loads.index(
-                    self.monthly_peak_cl[i]) / hours_in_day)
+                math.floor(int(np.argmax(month_rejection_loads)) /
+                           hours_in_day)
             # day of the month on which peak clg load occurs (e.g. 1-31)
             self.monthly_peak_hl_day[i] = \
-                math.floor(month_extraction_loads.index(
-                    self.monthly_peak_hl[i]) / hours_in_day)
+                math.floor(int(np.argmax(month_extraction_loads)) /
+                           hours_in_day)
 
             hours_in_previous_months += hours_in_month
 
@@ -330,10 +341,12 @@ class HybridLoad:
         # for the possibility that a peak load occurs on the first day of the
         # year
 
-        hourly_rejection_loads = \
-            self.hourly_rejection_loads[hours_in_year-hours_in_day:hours_in_year] + self.hourly_rejection_loads
-        hourly_extraction_loads = \
-            self.hourly_extraction_loads[hours_in_year-hours_in_day:hours_in_year] + self.hourly_extraction_loads
+        hourly_rejection_loads = np.concatenate((
+            self.hourly_rejection_loads[hours_in_year-hours_in_day:hours_in_year],
+            self.hourly_rejection_loads))
+        hourly_extraction_loads = np.concatenate((
+            self.hourly_extraction_loads[hours_in_year-hours_in_day:hours_in_year],
+            self.hourly_extraction_loads))
 
         # Keep track of how many hours are in
         # start at 24 since we added the last day of the year to the beginning
@@ -356,11 +369,11 @@ class HybridLoad:
             # monthly cooling loads (or heat rejection) in kWh
             two_day_hourly_peak_cl_load = \
                 hourly_rejection_loads[monthly_peak_cl_hour_start:
-                                       monthly_peak_cl_hour_start+2*hours_in_day]
+                                       monthly_peak_cl_hour_start+2*hours_in_day].tolist()
             # monthly heating loads (or heat extraction) in kWh
             two_day_hourly_peak_hl_load = \
                 hourly_extraction_loads[monthly_peak_hl_hour_start:
-                                        monthly_peak_hl_hour_start+2*hours_in_day]
+                                        monthly_peak_hl_hour_start+2*hours_in_day].tolist()
 
             assert len(two_day_hourly_peak_hl_load) == 2*hours_in_day and \
                    len(two_day_hourly_peak_cl_load) == 2*hours_in_day
@@ -533,9 +546,13 @@ class HybridLoad:
                   'Peak Duration': {}}
 
         d: dict = {}
-        # For all of the months, create dictionary of fields
-        for i in range(1, 13):
-            month_name = number_to_month(i)
+        # For all of the months, create dictionary of fields. When more than
+        # one year of loads is provided, the months are indexed by year and
+        # month name.
+        for i in range(1, len(self.days_in_month)):
+            month_name = number_to_month((i - 1) % 12 + 1)
+            if self.n_years > 1:
+                month_name = ((i - 1) // 12 + 1, month_name)
             d[month_name] = copy.deepcopy(hybrid_time_step_fields)
 
             # set total
@@ -575,7 +592,12 @@ class HybridLoad:
             res.append(tmp)
         res = np.array(res)
 
-        df = pd.DataFrame(res, index=list(d.keys()), columns=index)
+        if self.n_years > 1:
+            rows = pd.MultiIndex.from_tuples(list(d.keys()),
+                                             names=['Year', 'Month'])
+        else:
+            rows = list(d.keys())
+        df = pd.DataFrame(res, index=rows, columns=index)
 
         return df
 
@@ -589,13 +611,15 @@ class HybridLoad:
         #        self.sfload = np.append(self.sfload,0)
         lastzerohour = firstmonthhour(self.startmonth) - 1
         self.hour = np.append(self.hour, lastzerohour)
-        # Second, replicate months. [if we want to add an option where all
-        # monthly loads are explicitly given, this code will be in an if block]
+        # Second, replicate months. The months of all the years of loads
+        # provided are used as they are, and are then repeated when the
+        # simulation is longer than the loads provided.
+        n_months = len(self.days_in_month) - 1
         for i in range(self.startmonth, self.endmonth + 1):
-            if i > 12:
-                mi = i % 12
+            if i > n_months:
+                mi = i % n_months
                 if mi == 0:
-                    mi = 12
+                    mi = n_months
                 self.monthly_cl.append(self.monthly_cl[mi])
                 self.monthly_hl.append(self.monthly_hl[mi])
                 self.monthly_peak_cl.append(self.monthly_peak_cl[mi])
@@ -35,12 +35,14 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import collections
+
 import ghedt.peak_load_analysis_tool as plat
 import numpy as np
 from math import log, sqrt, exp
 from math import pi
 from scipy.interpolate import interp1d
-from scipy.linalg.lapack import dgtsv
+from scipy.linalg.lapack import dgttrf, dgttrs
 
 # Time constants
 DAYS_IN_YEAR = 365
@@ -62,6 +64,68 @@ class RadialCellType(object):
     SOIL = 5
 
 
+class STSCache(object):
+    """
+    An in-memory cache of the short time step g-functions computed by
+    RadialNumericalBH, for the g-functions that are computed more than once in
+    a process (e.g. the GHE of every field that a design search checks at the
+    same height and flow rate). The g-functions are kept by every input of
+    the radial numerical model other than the borehole height, as the g-values
+    at each time (in seconds). The height only changes ln(t/ts) (and, through
+    ts, the final time of the fixed time step), so one g-function serves all
+    heights with the same effective borehole resistance.
+
+    Parameters
+    ----------
+    maxsize: int, optional
+        The maximum number of g-functions kept in memory. Default is 32.
+    """
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self.g_values = collections.OrderedDict()
+
+        # The number of g-functions found and not found
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, n: int):
+        """
+        The first n g-values stored for the key, or None if there are not
+        that many g-values stored for the key.
+        """
+        g = self.g_values.get(key)
+        if g is None or len(g) < n:
+            self.misses += 1
+            return None
+        self.g_values.move_to_end(key)
+        self.hits += 1
+        return g[:n].copy()
+
+    def set(self, key: tuple, g) -> None:
+        """
+        Store the g-values for the key, unless more g-values are already
+        stored for the key.
+        """
+        existing = self.g_values.get(key)
+        if existing is None or len(existing) < len(g):
+            self.g_values[key] = np.array(g)
+        self.g_values.move_to_end(key)
+        while len(self.g_values) > self.maxsize:
+            self.g_values.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Remove all of the g-functions kept in memory.
+        """
+        self.g_values.clear()
+
+
+# The short time step g-functions are shared by every RadialNumericalBH in the
+# process unless another cache is given
+sts_cache = STSCache()
+
+
 class RadialNumericalBH(object):
     """
      X. Xu and Jeffrey D. Spitler. 2006. 'Modeling of Vertical Ground Loop Heat
@@ -72,9 +136,23 @@ class RadialNumericalBH(object):
 
     def __init__(
             self, single_u_tube: plat.borehole_heat_exchangers.SingleUTube,
-            ground_init_temp: float = 20., dtype: np.dtype = np.double):
+            ground_init_temp: float = 20., dtype: np.dtype = np.double,
+            time_stepping: str = 'fixed', grid: str = 'uniform',
+            num_grout_cells: int = None, num_soil_cells: int = None,
+            far_field_radius: float = 10., cache: STSCache = sts_cache):
+        # The grout and soil cells are either of 'uniform' thickness, or
+        # 'log' spaced (the ratio of the outer to inner radius of each cell
+        # is the same), which needs far fewer cells for the same accuracy.
+        # The number of grout and soil cells default to 27 and 500 for the
+        # uniform grid, and to 16 and 80 for the log spaced grid.
+        if grid not in ['uniform', 'log']:
+            raise ValueError('The grid should be either `uniform` or `log`.')
         self.single_u_tube = single_u_tube
         self.dtype = dtype
+        self.time_stepping = time_stepping
+        self.grid = grid
+        # The cache of the short time step g-functions (None to not cache)
+        self.cache = cache
 
         self.cell_inputs = {'type': 0,
                             'inner-radius': 1,
@@ -94,19 +172,22 @@ class RadialNumericalBH(object):
         self.num_fluid_cells = 3
         self.num_conv_cells = 1
         self.num_pipe_cells = 4
-        self.num_grout_cells = 27
-        self.num_soil_cells = 500
+        if num_grout_cells is None:
+            num_grout_cells = {'uniform': 27, 'log': 16}[grid]
+        if num_soil_cells is None:
+            num_soil_cells = {'uniform': 500, 'log': 80}[grid]
+        self.num_grout_cells = num_grout_cells
+        self.num_soil_cells = num_soil_cells
 
         self.num_cells = \
             self.num_fluid_cells + self.num_conv_cells + \
-            self.num_fluid_cells + self.num_grout_cells + \
-            self.num_soil_cells + 1
+            self.num_pipe_cells + self.num_grout_cells + \
+            self.num_soil_cells
 
         # Geometry and gridding procedure
 
-        # far-field radius is set to 10m; the soil region is represented by
-        # 500 cells
-        far_field_radius = 10  # soil radius (in meters)
+        # far-field radius is 10m by default (in meters)
+        self.far_field_radius = far_field_radius
         self.r_far_field = far_field_radius - single_u_tube.b.r_b
 
         # borehole radius is set to the actual radius of the borehole
@@ -131,6 +212,12 @@ class RadialNumericalBH(object):
         # pipe thickness is equivalent to original tube thickness
         self.thickness_conv = (self.r_in_tube - self.r_in_convection) / self.num_conv_cells
         self.thickness_fluid = (self.r_in_convection - self.r_fluid) / self.num_fluid_cells
+        # The ratio of the outer to inner radius of the grout and soil cells
+        # of the log spaced grid
+        self.ratio_grout = \
+            (self.r_borehole / self.r_out_tube) ** (1. / self.num_grout_cells)
+        self.ratio_soil = \
+            (self.r_far_field / self.r_borehole) ** (1. / self.num_soil_cells)
 
         # other
         self.init_temp = ground_init_temp
@@ -224,8 +311,12 @@ class RadialNumericalBH(object):
         for idx in range(cell_summation, num_grout_cells+cell_summation):
             j = idx - cell_summation
             cell_type = RadialCellType.GROUT
-            thickness = self.thickness_grout
-            inner_radius = self.r_out_tube + j * thickness
+            if self.grid == 'uniform':
+                thickness = self.thickness_grout
+                inner_radius = self.r_out_tube + j * thickness
+            else:
+                inner_radius = self.r_out_tube * self.ratio_grout ** j
+                thickness = inner_radius * (self.ratio_grout - 1.)
             center_radius = inner_radius + thickness / 2.0
             outer_radius = inner_radius + thickness
             conductivity = log(self.r_borehole / self.r_in_tube) / (
@@ -245,8 +336,12 @@ class RadialNumericalBH(object):
         for idx in range(cell_summation, num_soil_cells+cell_summation):
             j = idx - cell_summation
             cell_type = RadialCellType.SOIL
-            thickness = self.thickness_soil
-            inner_radius = self.r_borehole + j * thickness
+            if self.grid == 'uniform':
+                thickness = self.thickness_soil
+                inner_radius = self.r_borehole + j * thickness
+            else:
+                inner_radius = self.r_borehole * self.ratio_soil ** j
+                thickness = inner_radius * (self.ratio_soil - 1.)
             center_radius = inner_radius + thickness / 2.0
             outer_radius = inner_radius + thickness
             conductivity = self.single_u_tube.soil.k
@@ -259,12 +354,114 @@ class RadialNumericalBH(object):
         cell_summation += num_soil_cells
 
     def calc_sts_g_functions(
-            self, single_u_tube, final_time=None, calculate_at_bh_wall=False) -> tuple:
-
-        self.__init__(single_u_tube)
+            self, single_u_tube, final_time=None, calculate_at_bh_wall=False,
+            time_stepping=None, tolerance=1.0e-3, log_time_step=0.1) -> tuple:
+        # The time stepping is either 'fixed', with a time step of 2 minutes,
+        # or 'adaptive', where the time step grows with time under an error
+        # controller, and the g-function is output at the multiples of
+        # log_time_step in ln(t/ts). The tolerance is the largest error of
+        # the g-function allowed on one adaptive time step.
+        if calculate_at_bh_wall:
+            raise ValueError(
+                'This portion of the code does not currently run with this '
+                'vectorized radial numerical implementation.')
+
+        return calc_sts_g_functions_batch(
+            [self], [single_u_tube], final_time=final_time,
+            time_stepping=time_stepping, tolerance=tolerance,
+            log_time_step=log_time_step)[0]
+
+    def prepare_sts_g_function(self, single_u_tube, final_time, time_stepping,
+                               tolerance, log_time_step) -> tuple:
+        # Set up the radial numerical model of the borehole heat exchanger,
+        # and return the time stepping, the effective borehole resistance,
+        # the times the g-function is computed at, the cache key and the
+        # g-function if it is found in the cache (otherwise None)
+        if time_stepping is None:
+            time_stepping = self.time_stepping
+        if time_stepping not in ['fixed', 'adaptive']:
+            raise ValueError('The time stepping should be either `fixed` or '
+                             '`adaptive`.')
+
+        self.__init__(single_u_tube, ground_init_temp=self.init_temp,
+                      dtype=self.dtype, time_stepping=self.time_stepping,
+                      grid=self.grid, num_grout_cells=self.num_grout_cells,
+                      num_soil_cells=self.num_soil_cells,
+                      far_field_radius=self.far_field_radius,
+                      cache=self.cache)
 
         Rb = self.single_u_tube.compute_effective_borehole_resistance()
 
+        if final_time is None:
+            final_time = self.calc_time_in_sec
+
+        if time_stepping == 'fixed':
+            time_step = 120
+            # The times at the end of each step, the first step ending at
+            # 1e-12
+            n_steps = max(int(np.ceil(
+                (final_time - time_step - 1e-12) / time_step)), 0) + 1
+            time = (1e-12 - time_step) + time_step * np.arange(1, n_steps + 1)
+        else:
+            # The g-function is output on the multiples of the log time step
+            # from 1 minute to the final time, and at t = 0
+            k_start = int(np.ceil(np.log(60. / self.t_s) / log_time_step))
+            k_final = int(np.ceil(
+                np.log(final_time / self.t_s) / log_time_step - 1.0e-6))
+            lntts = np.arange(k_start, k_final + 1) * log_time_step
+            time = np.concatenate(([1e-12], self.t_s * np.exp(lntts)))
+
+        key = None
+        g = None
+        if self.cache is not None:
+            key = self.cache_key(Rb, time_stepping, tolerance, log_time_step,
+                                 final_time)
+            g = self.cache.get(key, len(time))
+
+        return time_stepping, Rb, time, key, g
+
+    def set_sts_g_function(self, time, g) -> tuple:
+        # Keep the g-function computed at each time
+        lntts = np.log(time / self.t_s)
+
+        self.g = g
+        self.lntts = lntts
+
+        self.g_sts = interp1d(lntts, g)
+
+        return self.lntts, self.g
+
+    def cache_key(self, Rb, time_stepping, tolerance, log_time_step,
+                  final_time) -> tuple:
+        # The inputs of the short time step g-function at each time. The
+        # times of the adaptive time step depend on ts and the final time.
+        single_u_tube = self.single_u_tube
+
+        def flatten(value):
+            return tuple(np.ravel(value).astype(float).tolist())
+
+        if time_stepping == 'fixed':
+            time_inputs = (time_stepping, )
+        else:
+            time_inputs = (time_stepping, float(tolerance),
+                           float(log_time_step), float(self.t_s),
+                           float(final_time))
+
+        return (
+            time_inputs,
+            (self.grid, self.num_grout_cells, self.num_soil_cells,
+             float(self.far_field_radius), np.dtype(self.dtype).str),
+            flatten([single_u_tube.b.r_b, single_u_tube.pipe.r_in,
+                     single_u_tube.pipe.r_out, single_u_tube.pipe.rhoCp]),
+            flatten([single_u_tube.fluid.rho, single_u_tube.fluid.cp]),
+            flatten([single_u_tube.grout.rhoCp, single_u_tube.soil.k,
+                     single_u_tube.soil.rhoCp]),
+            flatten([single_u_tube.R_f, single_u_tube.R_p, Rb]))
+
+    def coefficients(self, Rb) -> tuple:
+        # The heat capacity of each cell, and the conductances to the
+        # previous and the next cell. The last cell is the far field, which
+        # stays at the initial temperature, so it has none.
         R_f_eq = self.single_u_tube.R_f / 2.
         R_p_eq = self.single_u_tube.R_p / 2.
         R_TG_eq = Rb - R_f_eq
@@ -275,148 +472,248 @@ class RadialNumericalBH(object):
                                dtype=self.dtype)
         self.fill_radial_cell(radial_cell, R_p_eq, R_f_eq, R_TG_eq)
 
-        if final_time is None:
-            final_time = self.calc_time_in_sec
-
-        g = []
-        lntts = []
-
-        _dl = np.zeros(self.num_cells-1)
-        _d = np.zeros(self.num_cells)
-        _du = np.zeros(self.num_cells-1)
-        _b = np.zeros(self.num_cells)
-
-        heat_flux = 1.
-        init_temp = self.init_temp
-
-        time = (1e-12) - 120
-        time_step = 120
-
-        type_idx = self.cell_inputs['type']
         r_in_idx = self.cell_inputs['inner-radius']
         r_center_idx = self.cell_inputs['center-radius']
         r_out_idx = self.cell_inputs['outer-radius']
-        thickness_idx = self.cell_inputs['thickness']
         k_idx = self.cell_inputs['conductivity']
         rhoCp_idx = self.cell_inputs['heat-capacity']
-        temperature_idx = self.cell_inputs['initial-temperature']
-        previous_temperature_idx = self.cell_inputs['initial-temperature']
         volume_idx = self.cell_inputs['volume']
 
-        _fe_1 = np.zeros(shape=(self.num_cells - 2), dtype=self.dtype)
-        _fe_2 = np.zeros_like(_fe_1)
-        _ae = np.zeros_like(_fe_2)
-        _fw_1 = np.zeros_like(_ae)
-        _fw_2 = np.zeros_like(_fw_1)
-        _aw = np.zeros_like(_fw_2)
-        _ad = np.zeros_like(_aw)
-
-        _west_cell = radial_cell[:, 0:self.num_cells - 2]
-        _center_cell = radial_cell[:, 1:self.num_cells - 1]
-        _east_cell = radial_cell[:, 2:self.num_cells - 0]
-
-        while True:
-
-            time += time_step
-
-            # For the idx == 0 case:
-
-            fe_1 = \
-                log(radial_cell[r_out_idx, 0] / radial_cell[r_center_idx, 0]) \
-                / (2. * pi * radial_cell[k_idx, 0])
-            fe_2 = \
-                log(radial_cell[r_center_idx, 1] / radial_cell[r_in_idx, 1]) \
-                / (2. * pi * radial_cell[k_idx, 1])
-            ae = 1 / (fe_1 + fe_2)
-
-            ad = \
-                radial_cell[rhoCp_idx, 0] * radial_cell[volume_idx, 0] / time_step
-
-            _d[0] = -ae / ad - 1
-            _du[0] = ae / ad
-            _b[0] = -radial_cell[previous_temperature_idx, 0] - heat_flux / ad
-
-            # For the idx == n-1 case
-
-            _dl[self.num_cells-2] = 0.
-            _d[self.num_cells-1] = 1.
-            _b[self.num_cells-1] = \
-                radial_cell[previous_temperature_idx, self.num_cells-1]
-
-            # Now handle the 1 to n-2 cases with numpy slicing and vectorization
-
-            def fill_f1(fx_1, cell):
-                fx_1[:] = np.log(cell[r_out_idx, :] / cell[r_center_idx, :]) \
-                          / (2. * pi * cell[k_idx, :])
-                return
-
-            def fill_f2(fx_2, cell):
-                fx_2[:] = np.log(cell[r_center_idx, :] / cell[r_in_idx, :]) \
-                          / (2. * pi * cell[k_idx, :])
-                return
-
-            fill_f1(_fe_1, _center_cell)
-            fill_f2(_fe_2, _east_cell)
-            _ae[:] = 1. / (_fe_1 + _fe_2)
-
-            fill_f1(_fw_1, _west_cell)
-            fill_f2(_fw_2, _center_cell)
-            _aw[:] = -1. / (_fw_1 + _fw_2)
-
-            _ad[:] = _center_cell[rhoCp_idx, :] * _center_cell[volume_idx, :] / time_step
-
-            _dl[0:self.num_cells-2] = -_aw / _ad
-            _d[1:self.num_cells-1] = _aw / _ad - _ae / _ad - 1.
-            _du[1:self.num_cells-1] = _ae / _ad
-            _b[1:self.num_cells-1] = -radial_cell[previous_temperature_idx, 1:self.num_cells-1]
-
-            # Tri-diagonal matrix solver
-            # High level interface to LAPACK routine
-            # https://docs.scipy.org/doc/scipy/reference/generated/scipy.linalg.lapack.dgtsv.html#scipy.linalg.lapack.dgtsv
-            dgtsv(_dl, _d, _du, _b, overwrite_b=1)
-
-            radial_cell[previous_temperature_idx, :] = _b
-            radial_cell[temperature_idx, :] = _b
-
-            if calculate_at_bh_wall:
-                raise ValueError(
-                    'This portion of the code does not currently run with this '
-                    'vectorized radial numerical implementation.')
-                bh_wall_temp = 0
-
-                # calculate bh wall temp
-                for idx, this_cell in enumerate(self.cells):
-                    west_cell = self.cells[idx]
-                    east_cell = self.cells[idx + 1]
-
-                    if west_cell.type == RadialCellType.GROUT and east_cell.type == RadialCellType.SOIL:
-                        west_conductance_num = 2 * pi * west_cell.conductivity
-                        west_conductance_den = log(west_cell.outer_radius / west_cell.inner_radius)
-                        west_conductance = west_conductance_num / west_conductance_den
-
-                        east_conductance_num = 2 * pi * east_cell.conductivity
-                        east_conductance_den = log(east_cell.center_radius / west_cell.inner_radius)
-                        east_conductance = east_conductance_num / east_conductance_den
-
-                        bh_wall_temp_num_1 = west_conductance * west_cell.temperature
-                        bh_wall_temp_num_2 = east_conductance * east_cell.temperature
-                        bh_wall_temp_num = bh_wall_temp_num_1 + bh_wall_temp_num_2
-                        bh_wall_temp_den = west_conductance + east_conductance
-                        bh_wall_temp = bh_wall_temp_num / bh_wall_temp_den
-
-                        break
-
-                g.append(self.c_0 * ((bh_wall_temp - init_temp) / heat_flux))
-            else:
-                g.append(self.c_0 * ((radial_cell[temperature_idx, 0] - init_temp) / heat_flux - Rb))
-
-            lntts.append(log(time / self.t_s))
-
-            if time >= final_time - time_step:
-                self.g = np.insert(self.g, 0, g, axis=0)
-                self.lntts = np.insert(self.lntts, 0, lntts, axis=0)
-                break
-
-        self.g_sts = interp1d(lntts, g)
+        # The resistances from the center of each cell to its outer and inner
+        # faces
+        f_1 = np.log(radial_cell[r_out_idx, :] / radial_cell[r_center_idx, :]) \
+            / (2. * pi * radial_cell[k_idx, :])
+        f_2 = np.log(radial_cell[r_center_idx, :] / radial_cell[r_in_idx, :]) \
+            / (2. * pi * radial_cell[k_idx, :])
+        # The conductances between each cell and the next one, and to the
+        # previous one (there is none for the first cell)
+        _ae = 1. / (f_1[:-1] + f_2[1:])
+        _aw = np.concatenate(([0.], _ae[:-1]))
+        # The heat capacities of the cells
+        _c = radial_cell[rhoCp_idx, :-1] * radial_cell[volume_idx, :-1]
+
+        return _c, _aw, _ae
+
+    def march(self, Rb, time_stepping, time, tolerance) -> np.ndarray:
+        # March the radial numerical model in time, and return the
+        # g-function at each time
+        return march_batch([self], [Rb], time_stepping, [time], tolerance)[0]
+
+
+def calc_sts_g_functions_batch(
+        radial_numerical_bhs: list, single_u_tubes: list, final_time=None,
+        time_stepping=None, tolerance=1.0e-3, log_time_step=0.1) -> list:
+    """
+    Compute the short time step g-functions of many borehole heat exchangers
+    with one call (e.g. the pipe, grout and shank spacing options of a
+    screening study). The g-functions that are not in the cache are computed
+    together: the tri-diagonal systems of the radial numerical models are
+    stacked into one tri-diagonal system that is marched in time.
+
+    This is a convenience, not a way to make a sweep cost as little as one
+    solve. The borehole heat exchangers differ by their borehole thermal
+    resistance (and height), so each has its own matrix, and the cost still
+    grows with the total number of cells times the number of time steps. Only
+    the Python overhead of each time step is shared, which matters most for
+    short systems (e.g. the log spaced grid). Borehole heat exchangers with
+    the same inputs have the same g-function, which is computed once when
+    the cache is used.
+
+    The g-functions with the fixed time step are the same as those computed
+    one at a time by :meth:`RadialNumericalBH.calc_sts_g_functions`. With the
+    adaptive time step, the borehole heat exchangers that are output at the
+    same times share their time steps, which are set by the largest error of
+    the group, so each g-function is at least as accurate as when it is
+    computed alone.
+
+    Parameters
+    ----------
+    radial_numerical_bhs: list
+        The RadialNumericalBH objects, which are set up for the borehole heat
+        exchangers (in the same way as by calc_sts_g_functions).
+    single_u_tubes: list
+        The equivalent borehole heat exchangers, one per RadialNumericalBH.
+    final_time: float, optional
+        The final time (in seconds). Default is the final time of each
+        RadialNumericalBH.
+    time_stepping: str, optional
+        'fixed' or 'adaptive'. Default is the time stepping of each
+        RadialNumericalBH.
+    tolerance: float, optional
+        The largest error of the g-function on one adaptive time step.
+    log_time_step: float, optional
+        The interval of ln(t/ts) that the adaptive g-functions are output at.
+
+    Returns
+    -------
+    sts_g_functions: list
+        The (ln(t/ts), g) tuple of each borehole heat exchanger.
+    """
+    if len(radial_numerical_bhs) != len(single_u_tubes):
+        raise ValueError('There should be one borehole heat exchanger per '
+                         'RadialNumericalBH.')
+
+    inputs = []
+    # The g-functions to compute, grouped by the time steps they are marched
+    # with
+    groups = collections.OrderedDict()
+    # The borehole heat exchangers with the same cache key as one computed
+    # earlier in the batch, and the index of that one
+    duplicates = {}
+    first = {}
+    for i, (radial_numerical, single_u_tube) in \
+            enumerate(zip(radial_numerical_bhs, single_u_tubes)):
+        time_stepping_i, Rb, time, key, g = \
+            radial_numerical.prepare_sts_g_function(
+                single_u_tube, final_time, time_stepping, tolerance,
+                log_time_step)
+        inputs.append([time, key, g])
+        if g is not None:
+            continue
+        if key is not None:
+            if key in first:
+                duplicates[i] = first[key]
+                continue
+            first[key] = i
+        if time_stepping_i == 'fixed':
+            group = (time_stepping_i, np.dtype(radial_numerical.dtype).str)
+        else:
+            group = (time_stepping_i, np.dtype(radial_numerical.dtype).str,
+                     tuple(time.tolist()))
+        groups.setdefault(group, []).append((i, Rb))
+
+    for (time_stepping_i, *_), members in groups.items():
+        g_values = march_batch(
+            [radial_numerical_bhs[i] for i, _ in members],
+            [Rb for _, Rb in members], time_stepping_i,
+            [inputs[i][0] for i, _ in members], tolerance)
+        for (i, _), g in zip(members, g_values):
+            inputs[i][2] = g
+            # Only the computed g-functions are stored in the cache
+            if inputs[i][1] is not None:
+                radial_numerical_bhs[i].cache.set(inputs[i][1], g)
+    for i, j in duplicates.items():
+        inputs[i][2] = inputs[j][2].copy()
+
+    return [radial_numerical.set_sts_g_function(time, g)
+            for radial_numerical, (time, key, g)
+            in zip(radial_numerical_bhs, inputs)]
+
+
+def march_batch(radial_numerical_bhs: list, Rb_values: list,
+                time_stepping: str, times: list, tolerance: float) -> list:
+    """
+    March the radial numerical models of one or more borehole heat exchangers
+    in time together, and return the g-function of each at its times. The
+    fixed time step g-functions may have different numbers of times. The
+    adaptive time step g-functions should all have the same times.
+    """
+    heat_flux = 1.
+    dtype = radial_numerical_bhs[0].dtype
+
+    # The cells of all of the models are stacked into one tri-diagonal
+    # system. The far field cell of each model has no conductances, so the
+    # models are not coupled, and the far field cell has a heat capacity of
+    # 1 so that its row of the matrix is the identity. The work of each
+    # solve is still proportional to the total number of cells.
+    _c, _aw, _ae, init_temps = [], [], [], []
+    for radial_numerical, Rb in zip(radial_numerical_bhs, Rb_values):
+        c, aw, ae = radial_numerical.coefficients(Rb)
+        _c.extend([c, [1.]])
+        _aw.extend([aw, [0.]])
+        _ae.extend([ae, [0.]])
+        init_temps.append(np.full(radial_numerical.num_cells,
+                                  radial_numerical.init_temp, dtype=dtype))
+    _c = np.concatenate(_c)
+    _aw = np.concatenate(_aw)
+    _ae = np.concatenate(_ae)
+    # The first cell of each model, its initial temperature and 2 pi k_s
+    offsets = np.cumsum(
+        [0] + [radial_numerical.num_cells
+               for radial_numerical in radial_numerical_bhs[:-1]])
+    init_temp = np.array(
+        [radial_numerical.init_temp
+         for radial_numerical in radial_numerical_bhs], dtype=dtype)
+    c_0 = np.array([radial_numerical.c_0
+                    for radial_numerical in radial_numerical_bhs])
+    num_cells = len(_c)
+
+    # The cell properties do not change with time, so the tri-diagonal
+    # matrix of the implicit scheme only changes with the time step. It
+    # is factorized once for each time step, and each step is a forward
+    # and back substitution.
+    def factorize(time_step):
+        _ad = _c / time_step
+        _dl = -_aw[1:] / _ad[1:]
+        _d = 1. + (_aw / _ad + _ae / _ad)
+        _du = -_ae[:-1] / _ad[:-1]
+        # LU factorization of the tri-diagonal matrix
+        # https://docs.scipy.org/doc/scipy/reference/generated/scipy.linalg.lapack.dgttrf.html
+        dl, d, du, du2, ipiv, info = dgttrf(_dl, _d, _du)
+        if info != 0:
+            raise ValueError('The radial numerical tri-diagonal matrix is '
+                             'singular.')
+        # The heat flux into the first cell of each model over the time step
+        source = np.zeros(num_cells, dtype=dtype)
+        source[offsets] = heat_flux / _ad[offsets]
+        return dl, d, du, du2, ipiv, source
+
+    def step(factors, temperatures):
+        # The right hand side of each step is the previous temperatures,
+        # with the heat flux into the first cells
+        dl, d, du, du2, ipiv, source = factors
+        _b = temperatures + source
+        # https://docs.scipy.org/doc/scipy/reference/generated/scipy.linalg.lapack.dgttrs.html
+        _b, info = dgttrs(dl, d, du, du2, ipiv, _b, overwrite_b=1)
+        return _b
+
+    _b = np.concatenate(init_temps)
+    n_times = max(len(time) for time in times)
+    T_0 = np.zeros((n_times, len(offsets)), dtype=dtype)
+
+    if time_stepping == 'fixed':
+        time_step = 120
 
-        return self.lntts, self.g
+        dl, d, du, du2, ipiv, source = factorize(time_step)
+        for n in range(n_times):
+            _b += source
+            _b, info = dgttrs(dl, d, du, du2, ipiv, _b, overwrite_b=1)
+            T_0[n] = _b[offsets]
+    else:
+        time = times[0]
+        if any(not np.array_equal(other, time) for other in times[1:]):
+            raise ValueError('The adaptive time step g-functions marched '
+                             'together should have the same times.')
+        T_0[0] = init_temp
+        t = 0.
+        time_step = 1.
+        for n in range(1, len(time)):
+            while t < time[n] * (1. - 1.0e-12):
+                h = min(time_step, time[n] - t)
+                # Step doubling: the difference between one step and two
+                # half steps estimates the error of the half steps, and
+                # the extrapolation of the two is second order accurate
+                T_full = step(factorize(h), _b)
+                half = factorize(h / 2.)
+                T_half = step(half, step(half, _b))
+                error = np.max(c_0 * np.abs(
+                    T_half[offsets] - T_full[offsets])) / heat_flux
+                if error > 0.:
+                    factor = min(2., max(0.2, 0.9 * sqrt(tolerance / error)))
+                else:
+                    factor = 2.
+                if error <= tolerance:
+                    _b = 2. * T_half - T_full
+                    t += h
+                    # A step that is cut short to reach the output time
+                    # does not shrink the time step
+                    if factor < 1.:
+                        time_step = h * factor
+                    else:
+                        time_step = max(time_step, h * factor)
+                else:
+                    time_step = h * factor
+            T_0[n] = _b[offsets]
+
+    g = c_0 * ((T_0 - init_temp) / heat_flux - np.array(Rb_values))
+    return [g[:len(time), j] for j, time in enumerate(times)]
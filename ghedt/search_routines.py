@@ -9,6 +9,19 @@ import numpy as np
 import copy
 
 
+# The options of the g-function calculations (see
+# ghedt.gfunction.compute_live_g_function) at each fidelity of a search. The
+# low fidelity g-functions (4 equal segments with a uniform borehole wall
+# temperature) are within a few percent of the high fidelity g-functions, and
+# are 1.5 to 3.5 times faster to compute.
+g_function_fidelities = {
+    'low': {'nSegments': 4, 'segments': 'equal', 'solver': 'equivalent',
+            'boundary': 'UBWT'},
+    'high': {'nSegments': 8, 'segments': 'unequal', 'solver': 'equivalent',
+             'boundary': 'MIFT'},
+}
+
+
 class Bisection1D:
     def __init__(self, coordinates_domain: list, V_flow: float,
                  borehole: gt.boreholes.Borehole,
@@ -17,7 +30,9 @@ class Bisection1D:
                  grout: plat.media.Grout, soil: plat.media.Soil,
                  sim_params: plat.media.SimulationParameters,
                  hourly_extraction_ground_loads: list, method: str = 'hybrid',
-                 flow: str = 'borehole', max_iter=15, disp=False, search=True):
+                 flow: str = 'borehole', max_iter=15, disp=False, search=True,
+                 cache=None, library=None, fidelity: str = 'high',
+                 surrogate=None):
 
         # Take the lowest part of the coordinates domain to be used for the
         # initial setup
@@ -37,14 +52,60 @@ class Bisection1D:
         self.coordinates_domain = coordinates_domain
         self.max_iter = max_iter
         self.disp = disp
+        # An optional ghedt.gfunction_cache.GFunctionCache that the computed
+        # g-functions are loaded from and stored in
+        self.cache = cache
+        # The search revisits the same fields (e.g. the ends of the domain and
+        # the selected field), so the g-functions computed during the search
+        # are also kept in memory. The number of g-functions found and not
+        # found in memory are g_function_cache.hits and .misses.
+        self.g_function_cache = \
+            dt.gfunction_cache.LRUGFunctionCache(backing=cache)
+        # The fields of the search share most of the distances between their
+        # boreholes, so the FLS response factors at each distance are kept
+        # and only evaluated for the distances that are new to a field
+        self.response_factors = dt.gfunction.ResponseFactorCache()
+        # An optional ghedt.gfunction_library.GFunctionLibrary. The
+        # g-functions of the fields in the library are interpolated from the
+        # library rather than computed.
+        self.library = library
+        # An optional ghedt.gfunction_surrogate.GFunctionSurrogate. The
+        # high fidelity g-functions computed during the search are added to
+        # its training samples.
+        self.surrogate = surrogate
+        # The fidelity of the g-functions used to search the domain. With
+        # 'coarse-to-fine', the fields are bracketed with low fidelity
+        # g-functions, and with 'surrogate' with the g-functions of the
+        # surrogate model. The final bracket is then checked again with high
+        # fidelity g-functions. The number of excess temperature evaluations
+        # at each fidelity are kept in self.evaluations, and the excess
+        # temperatures of the fields checked with both fidelities in
+        # self.screening_errors. The routines that search several domains
+        # (Bisection2D and BisectionZD) label each one, and the screening
+        # errors are kept by (domain label, field index) together with the
+        # number of boreholes in the field.
+        if fidelity == 'high':
+            self.search_fidelity = 'high'
+        elif fidelity == 'coarse-to-fine':
+            self.search_fidelity = 'low'
+        elif fidelity == 'surrogate':
+            if surrogate is None:
+                raise ValueError('A surrogate is needed for the `surrogate` '
+                                 'fidelity.')
+            self.search_fidelity = 'surrogate'
+        else:
+            raise ValueError('The fidelity argument should be either `high`, '
+                             '`coarse-to-fine` or `surrogate`.')
+        self.fidelity = fidelity
+        self.evaluations = {key: 0 for key in g_function_fidelities}
+        self.evaluations['surrogate'] = 0
+        self.screening_errors = {}
+        self.domain_label = 'domain'
 
         B = dt.utilities.borehole_spacing(borehole, coordinates)
 
-        # Calculate a g-function for uniform inlet fluid temperature with
-        # 8 unequal segments using the equivalent solver
-        g_function = dt.gfunction.compute_live_g_function(
-            B, [borehole.H], [borehole.r_b], [borehole.D], m_flow_borehole,
-            self.bhe_object, self.log_time, coordinates, fluid, pipe, grout,
+        g_function = self.retrieve_g_function(
+            B, coordinates, borehole, m_flow_borehole, fluid, pipe, grout,
             soil)
 
         # Initialize the GHE object
@@ -71,7 +132,35 @@ class Bisection1D:
                              'or `system`.')
         return V_flow_system, m_flow_borehole
 
-    def initialize_ghe(self, coordinates, H):
+    def retrieve_g_function(self, B, coordinates, borehole, m_flow_borehole,
+                            fluid, pipe, grout, soil, fidelity='high'):
+        # Look the field up in the g-function library (if there is one)
+        if self.library is not None:
+            g_function = self.library.g_function(
+                B, coordinates, borehole, m_flow_borehole, self.bhe_object,
+                fluid, pipe, grout, soil, log_time=self.log_time)
+            if g_function is not None:
+                return g_function
+
+        if fidelity == 'surrogate':
+            return self.surrogate.g_function(B, coordinates, borehole)
+
+        # Calculate a g-function with the options of the fidelity (for high
+        # fidelity, uniform inlet fluid temperature with 8 unequal segments
+        # using the equivalent solver)
+        g_function = dt.gfunction.compute_live_g_function(
+            B, [borehole.H], [borehole.r_b], [borehole.D], m_flow_borehole,
+            self.bhe_object, self.log_time, coordinates, fluid, pipe, grout,
+            soil, cache=self.g_function_cache,
+            response_factors=self.response_factors,
+            **g_function_fidelities[fidelity])
+
+        if fidelity == 'high' and self.surrogate is not None:
+            self.surrogate.add(g_function)
+
+        return g_function
+
+    def initialize_ghe(self, coordinates, H, fidelity='high'):
         V_flow_system, m_flow_borehole = \
             self.retrieve_flow(coordinates, self.ghe.bhe.fluid.rho)
 
@@ -84,12 +173,9 @@ class Bisection1D:
 
         B = dt.utilities.borehole_spacing(borehole, coordinates)
 
-        # Calculate a g-function for uniform inlet fluid temperature with
-        # 8 unequal segments using the equivalent solver
-        g_function = dt.gfunction.compute_live_g_function(
-            B, [borehole.H], [borehole.r_b], [borehole.D], m_flow_borehole,
-            self.bhe_object, self.log_time, coordinates, fluid, pipe, grout,
-            soil)
+        g_function = self.retrieve_g_function(
+            B, coordinates, borehole, m_flow_borehole, fluid, pipe, grout,
+            soil, fidelity=fidelity)
 
         # Initialize the GHE object
         self.ghe = dt.ground_heat_exchangers.GHE(
@@ -97,10 +183,20 @@ class Bisection1D:
             soil, g_function, self.sim_params,
             self.hourly_extraction_ground_loads)
 
-    def calculate_excess(self, coordinates, H):
-        self.initialize_ghe(coordinates, H)
-        # Simulate after computing just one g-function
-        max_HP_EFT, min_HP_EFT = self.ghe.simulate(method=self.method)
+    def calculate_excess(self, coordinates, H, fidelity=None,
+                         early_exit=True):
+        # The excess temperatures of the search are computed at the search
+        # fidelity unless another fidelity is given
+        if fidelity is None:
+            fidelity = self.search_fidelity
+        self.evaluations[fidelity] += 1
+        self.initialize_ghe(coordinates, H, fidelity=fidelity)
+        # Simulate after computing just one g-function. Only the sign of a
+        # positive excess temperature is used by the search, so with
+        # early_exit the simulation stops once the fluid temperature limits
+        # are violated, and a positive excess temperature is a lower bound.
+        max_HP_EFT, min_HP_EFT = self.ghe.simulate(method=self.method,
+                                                   early_exit=early_exit)
         T_excess = self.ghe.cost(max_HP_EFT, min_HP_EFT)
 
         # This is more of a debugging statement. May remove it in the future.
@@ -110,6 +206,78 @@ class Bisection1D:
 
         return T_excess
 
+    def refine_bracket(self, idx):
+        # Check the field found with the search fidelity (the first field in
+        # the domain whose excess temperature is not positive) with high
+        # fidelity g-functions. The field is moved one step at a time until
+        # its high fidelity excess temperature is not positive and that of
+        # the field before it is. The calculated temperatures are replaced by
+        # the high fidelity temperatures. The fields are simulated without
+        # early exit, so that their excess temperatures can be compared.
+        H = self.sim_params.max_Height
+        screened_temperatures = self.calculated_temperatures
+        temperatures = {}
+        while True:
+            for i in [idx, idx - 1]:
+                if i >= 0 and i not in temperatures:
+                    temperatures[i] = self.calculate_excess(
+                        self.coordinates_domain[i], H, fidelity='high',
+                        early_exit=False)
+            if temperatures[idx] > 0.0:
+                if idx == len(self.coordinates_domain) - 1:
+                    raise ValueError(
+                        'Based on the loads provided, the excess temperature '
+                        'for the maximum number of boreholes falls above 0 '
+                        'with high fidelity g-functions.')
+                idx += 1
+            elif idx > 0 and temperatures[idx - 1] <= 0.0:
+                idx -= 1
+            else:
+                break
+        if self.disp:
+            print('Checked the bracket with high fidelity g-functions.')
+
+        # The excess temperatures of the fields found with both fidelities.
+        # The surrogate is inexpensive, so every field checked with high
+        # fidelity is also evaluated with the surrogate. The positive excess
+        # temperatures of the search are lower bounds, so they are computed
+        # again without early exit.
+        for i in sorted(temperatures):
+            if (i not in screened_temperatures and
+                    self.search_fidelity == 'surrogate') or \
+                    screened_temperatures.get(i, 0.) > 0.:
+                screened_temperatures[i] = self.calculate_excess(
+                    self.coordinates_domain[i], H, early_exit=False)
+            if i in screened_temperatures:
+                self.screening_errors[(self.domain_label, i)] = \
+                    (len(self.coordinates_domain[i]),
+                     screened_temperatures[i], temperatures[i])
+
+        self.calculated_temperatures = temperatures
+
+        return idx
+
+    def evaluation_report(self) -> str:
+        # The number of excess temperature evaluations made at each fidelity
+        lines = ['Excess temperature evaluations',
+                 '------------------------------']
+        for fidelity, n in self.evaluations.items():
+            lines.append('{:<24}{:>6}'.format(fidelity, n))
+        lines.append('{:<24}{:>6}'.format('total',
+                                           sum(self.evaluations.values())))
+        if len(self.screening_errors) > 0:
+            lines += ['', 'Excess temperatures (C) of the checked fields',
+                      '{:<10}{:>6}{:>11}{:>11}{:>11}{:>11}'.format(
+                          'domain', 'field', 'boreholes', self.search_fidelity,
+                          'high', 'error')]
+            for (label, i), (nbh, T_screened, T_high) in \
+                    self.screening_errors.items():
+                lines.append(
+                    '{:<10}{:>6}{:>11}{:>11.3f}{:>11.3f}{:>11.3f}'.format(
+                        label, i, nbh, T_screened, T_high,
+                        T_screened - T_high))
+        return '\n'.join(lines)
+
     def search(self):
 
         xL_idx = 0
@@ -133,9 +301,11 @@ class Bisection1D:
         if check_bracket(sign(T_0_lower), sign(T_0_upper)):
             if self.disp:
                 print('Size between min and max of lower bound in domain.')
-            self.initialize_ghe(self.coordinates_domain[0],
-                                self.sim_params.max_Height)
-            return 0, self.coordinates_domain[0]
+            if self.search_fidelity == 'high' or self.refine_bracket(0) == 0:
+                self.initialize_ghe(self.coordinates_domain[0],
+                                    self.sim_params.max_Height)
+                return 0, self.coordinates_domain[0]
+            return self.select_field()
         elif check_bracket(sign(T_0_upper), sign(T_m1)):
             if self.disp:
                 print('Perform the integer bisection search routine.')
@@ -191,6 +361,14 @@ class Bisection1D:
         H = self.sim_params.max_Height
 
         self.calculate_excess(coordinates, H)
+
+        if self.search_fidelity != 'high':
+            self.refine_bracket(xR_idx)
+
+        return self.select_field()
+
+    def select_field(self):
+        H = self.sim_params.max_Height
         # Make sure the field being returned pertains to the index which is the
         # closest to 0 but also negative (the maximum of all 0 or negative
         # excess temperatures)
@@ -218,7 +396,9 @@ class Bisection2D(Bisection1D):
                  grout: plat.media.Grout, soil: plat.media.Soil,
                  sim_params: plat.media.SimulationParameters,
                  hourly_extraction_ground_loads: list, method: str = 'hybrid',
-                 flow: str = 'borehole', max_iter=15, disp=False):
+                 flow: str = 'borehole', max_iter=15, disp=False,
+                 cache=None, library=None, fidelity: str = 'high',
+                 surrogate=None):
         if disp:
             print('Note: This routine requires a nested bisection search.')
 
@@ -228,7 +408,8 @@ class Bisection2D(Bisection1D):
             self, coordinates_domain, V_flow, borehole, bhe_object,
             fluid, pipe, grout, soil, sim_params,
             hourly_extraction_ground_loads, method=method, flow=flow,
-            max_iter=max_iter, disp=disp, search=False)
+            max_iter=max_iter, disp=disp, search=False, cache=cache,
+            library=library, fidelity=fidelity, surrogate=surrogate)
 
         self.coordinates_domain_nested = []
         self.calculated_temperatures_nested = []
@@ -239,6 +420,7 @@ class Bisection2D(Bisection1D):
             outer_domain.append(coordinates_domain_nested[i][-1])
 
         self.coordinates_domain = outer_domain
+        self.domain_label = 'outer'
 
         selection_key, selected_coordinates = self.search()
 
@@ -249,6 +431,7 @@ class Bisection2D(Bisection1D):
         # on the index
         inner_domain = coordinates_domain_nested[selection_key-1]
         self.coordinates_domain = inner_domain
+        self.domain_label = 'inner {}'.format(selection_key-1)
 
         # Reset calculated temperatures
         self.calculated_temperatures = {}
@@ -264,7 +447,9 @@ class BisectionZD(Bisection1D):
                  grout: plat.media.Grout, soil: plat.media.Soil,
                  sim_params: plat.media.SimulationParameters,
                  hourly_extraction_ground_loads: list, method: str = 'hybrid',
-                 flow: str = 'borehole', max_iter=15, disp=False):
+                 flow: str = 'borehole', max_iter=15, disp=False,
+                 cache=None, library=None, fidelity: str = 'high',
+                 surrogate=None):
         if disp:
             print('Note: This design routine currently requires several '
                   'bisection searches.')
@@ -275,7 +460,8 @@ class BisectionZD(Bisection1D):
             self, coordinates_domain, V_flow, borehole, bhe_object,
             fluid, pipe, grout, soil, sim_params,
             hourly_extraction_ground_loads, method=method, flow=flow,
-            max_iter=max_iter, disp=disp, search=False)
+            max_iter=max_iter, disp=disp, search=False, cache=cache,
+            library=library, fidelity=fidelity, surrogate=surrogate)
 
         self.coordinates_domain_nested = coordinates_domain_nested
         self.calculated_temperatures_nested = {}
@@ -286,6 +472,7 @@ class BisectionZD(Bisection1D):
             outer_domain.append(coordinates_domain_nested[i][-1])
 
         self.coordinates_domain = outer_domain
+        self.domain_label = 'outer'
 
         self.selection_key_outer, self.selected_coordinates_outer = \
             self.search()
@@ -307,6 +494,7 @@ class BisectionZD(Bisection1D):
         while i < len(self.coordinates_domain_nested) and i < max_iter:
 
             self.coordinates_domain = self.coordinates_domain_nested[i]
+            self.domain_label = 'inner {}'.format(i)
             self.calculated_temperatures = {}
             try:
                 selection_key, selected_coordinates = self.search()
@@ -315,7 +503,9 @@ class BisectionZD(Bisection1D):
             self.calculated_temperatures_nested[i] = \
                 copy.deepcopy(self.calculated_temperatures)
 
-            self.ghe.compute_g_functions()
+            self.ghe.compute_g_functions(
+                cache=self.g_function_cache,
+                response_factors=self.response_factors)
             self.ghe.size(method='hybrid')
 
             nbh = len(selected_coordinates)
@@ -352,7 +542,8 @@ class BisectionZD(Bisection1D):
             self.coordinates_domain_nested[selection_key_outer][selection_key]
 
         self.initialize_ghe(selected_coordinates, self.sim_params.max_Height)
-        self.ghe.compute_g_functions()
+        self.ghe.compute_g_functions(cache=self.g_function_cache,
+                                     response_factors=self.response_factors)
         self.ghe.size(method='hybrid')
 
         return selection_key, selected_coordinates
@@ -13,7 +13,9 @@ import numpy as np
 import json
 from matplotlib.ticker import Locator
 import pickle
+import struct
 import warnings
+import zipfile
 
 
 # Time functions
@@ -133,6 +135,44 @@ def js_load(filename: str):
         return json.load(f_in)
 
 
+def npz_load(filename: str, mmap_mode=None) -> dict:
+    # Load the arrays of a numpy archive (.npz) into a dictionary. If a
+    # mmap_mode ('r', 'r+' or 'c', see numpy.memmap) is given, the arrays of an
+    # uncompressed archive (numpy.savez) are memory-mapped from the file rather
+    # than read into memory.
+    if mmap_mode is None:
+        with np.load(filename) as data:
+            return {name: data[name] for name in data.files}
+
+    arrays = {}
+    with zipfile.ZipFile(filename) as archive, open(filename, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError('Only the arrays of an uncompressed archive '
+                                 'can be memory-mapped.')
+            # The data of a member follows its 30 byte local file header, the
+            # file name and the extra field
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            # The data is a .npy file
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                header = np.lib.format.read_array_header_1_0(f)
+            else:
+                header = np.lib.format.read_array_header_2_0(f)
+            shape, fortran_order, dtype = header
+            name = info.filename[:-len('.npy')]
+            if int(np.prod(shape)) == 0:
+                # An empty array can not be memory-mapped
+                arrays[name] = np.empty(shape, dtype=dtype)
+                continue
+            arrays[name] = np.memmap(
+                filename, dtype=dtype, mode=mmap_mode, shape=shape,
+                order='F' if fortran_order else 'C', offset=f.tell())
+    return arrays
+
+
 def create_if_not(directory):
     import os
     if not os.path.exists(directory):
@@ -175,3 +175,89 @@ class TestNearSquare(unittest.TestCase, DesignBase):
         # the values are not equal starting around the 9th decimal place.
         H_reference = 130.18183587536208
         self.assertAlmostEqual(H_reference, H_single_u_tube_a, places=8)
+
+    def test_coarse_to_fine(self):
+        def find_design(fidelity):
+            design = dt.design.Design(
+                self.V_flow_borehole, self.borehole, self.single_u_tube,
+                self.fluid, self.pipe_single, self.grout, self.soil,
+                self.sim_params, self.geometric_constraints,
+                self.hourly_extraction_ground_loads, routine='near-square',
+                fidelity=fidelity)
+            return design.find_design()
+
+        bisection_search = find_design('high')
+        bisection_search_coarse = find_design('coarse-to-fine')
+
+        # The field is bracketed with low fidelity g-functions, and the final
+        # bracket is checked with high fidelity g-functions, so the same
+        # field is selected
+        self.assertEqual(bisection_search.selection_key,
+                         bisection_search_coarse.selection_key)
+        self.assertEqual(bisection_search.evaluations['low'], 0)
+        self.assertGreater(bisection_search_coarse.evaluations['low'], 0)
+        self.assertLess(bisection_search_coarse.evaluations['high'],
+                        bisection_search.evaluations['high'])
+        self.assertIn('low', bisection_search_coarse.evaluation_report())
+        # The excess temperatures of the checked fields are not cut short by
+        # the early exit of the search
+        for (label, i), (nbh, T_low, T_high) in \
+                bisection_search_coarse.screening_errors.items():
+            self.assertEqual(label, 'domain')
+            coordinates = bisection_search_coarse.coordinates_domain[i]
+            self.assertEqual(nbh, len(coordinates))
+            for fidelity, T_excess in [('low', T_low), ('high', T_high)]:
+                self.assertEqual(T_excess,
+                                 bisection_search_coarse.calculate_excess(
+                                     coordinates, self.sim_params.max_Height,
+                                     fidelity=fidelity, early_exit=False))
+
+
+class TestBiRectangle(unittest.TestCase, DesignBase):
+
+    def setUp(self) -> None:
+
+        DesignBase.__init__(self)
+
+        hourly_extraction: dict = \
+            pd.read_csv(TESTDATA_FILENAME).to_dict('list')
+        self.hourly_extraction_ground_loads: list = \
+            hourly_extraction[list(hourly_extraction.keys())[0]]
+
+        # Geometric constraints for the `bi-rectangle` and `bi-zoned`
+        # routines
+        self.geometric_constraints = dt.media.GeometricConstraints(
+            length=85., width=36.5, B_min=4.45, B_max_x=10., B_max_y=12.)
+
+    def test_coarse_to_fine_report(self):
+        for routine in ['bi-rectangle', 'bi-zoned']:
+            design = dt.design.Design(
+                self.V_flow_borehole, self.borehole, self.single_u_tube,
+                self.fluid, self.pipe_single, self.grout, self.soil,
+                self.sim_params, self.geometric_constraints,
+                self.hourly_extraction_ground_loads, routine=routine,
+                fidelity='coarse-to-fine')
+            bisection_search = design.find_design()
+
+            # The screening errors of the outer domain and of the inner
+            # domains are kept apart, with the number of boreholes of each
+            # field when it was checked
+            labels = {label for label, i in bisection_search.screening_errors}
+            self.assertIn('outer', labels)
+            self.assertGreater(len(labels), 1)
+            outer_domain = [design.coordinates_domain_nested[0][0]] + \
+                [domain[-1] for domain in design.coordinates_domain_nested]
+            for (label, i), (nbh, T_screened, T_high) in \
+                    bisection_search.screening_errors.items():
+                if label == 'outer':
+                    coordinates = outer_domain[i]
+                else:
+                    coordinates = design.coordinates_domain_nested[
+                        int(label.split()[1])][i]
+                self.assertEqual(nbh, len(coordinates))
+
+            report = bisection_search.evaluation_report()
+            self.assertEqual(
+                len(report.splitlines()),
+                len(bisection_search.evaluations) + 6 +
+                len(bisection_search.screening_errors))
@@ -0,0 +1,217 @@
+# agent
+# Saturday, October 17, 2026
+
+import unittest
+import os
+import tempfile
+
+import ghedt as dt
+import ghedt.peak_load_analysis_tool as plat
+import pygfunction as gt
+
+import numpy as np
+from scipy.interpolate import interp1d
+
+G_FUNCTION_FILENAME = os.path.join(
+    os.path.dirname(__file__), '..', 'ghedt', 'examples', 'gFunctions',
+    'GLHEPRO_gFunctions_12x13.json')
+
+
+class TestGFunction(unittest.TestCase):
+
+    def setUp(self) -> None:
+        data = dt.utilities.js_load(G_FUNCTION_FILENAME)
+        geothermal_g_input = \
+            dt.gfunction.GFunction.configure_database_file_for_usage(data)
+        self.g_function = dt.gfunction.GFunction(**geothermal_g_input)
+        self.B = self.g_function.B
+
+    def test_g_function_interpolation(self):
+        heights = list(self.g_function.g_lts.keys())
+        H = 150.
+
+        # The g-function is interpolated at each ln(t/ts) between the heights
+        g, rb, D, H_eq = \
+            self.g_function.g_function_interpolation(self.B / H, kind='cubic')
+        self.assertAlmostEqual(H_eq, H)
+        for i in range(len(self.g_function.log_time)):
+            f = interp1d(heights,
+                         [self.g_function.g_lts[h][i] for h in heights],
+                         kind='cubic')
+            self.assertAlmostEqual(g[i], float(f(H)), places=10)
+
+        # At one of the heights, the g-function is the one stored
+        g, rb, D, H_eq = self.g_function.g_function_interpolation(
+            self.B / heights[2])
+        self.assertTrue(np.allclose(g, self.g_function.g_lts[heights[2]],
+                                    rtol=0., atol=1.0e-10))
+
+    def test_batch_interpolation(self):
+        B_over_H = self.B / np.array([50., 100., 150., 300.])
+        g_batch, rb_batch, D_batch, H_eq_batch = \
+            self.g_function.g_function_interpolation(B_over_H)
+        self.assertEqual(
+            g_batch.shape, (B_over_H.size, len(self.g_function.log_time)))
+        for i in range(B_over_H.size):
+            g, rb, D, H_eq = \
+                self.g_function.g_function_interpolation(B_over_H[i])
+            self.assertTrue(np.array_equal(g_batch[i], g))
+            self.assertEqual(rb_batch[i], rb)
+            self.assertEqual(H_eq_batch[i], H_eq)
+
+    def test_interpolation_kinds(self):
+        # The interpolation tables are kept for each kind of interpolation
+        H = 150.
+        g_linear, _, _, _ = self.g_function.g_function_interpolation(
+            self.B / H, kind='linear')
+        g_cubic, _, _, _ = self.g_function.g_function_interpolation(
+            self.B / H, kind='cubic')
+        g_linear_again, _, _, _ = self.g_function.g_function_interpolation(
+            self.B / H, kind='linear')
+        self.assertEqual(
+            set(self.g_function.interpolation_table.keys()),
+            {'linear', 'cubic'})
+        self.assertFalse(np.allclose(g_linear, g_cubic))
+        self.assertEqual(g_linear, g_linear_again)
+
+    def test_save_and_load(self):
+        g_functions = [self.g_function, dt.gfunction.GFunction.from_values(
+            2. * self.B, [96.], [0.075], [2.],
+            [np.linspace(1., 10., len(self.g_function.log_time))],
+            self.g_function.log_time, [(0., 0.), (2. * self.B, 0.)])]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'g_functions.npz')
+            dt.gfunction.save_g_functions(path, g_functions)
+            for mmap_mode in [None, 'r']:
+                loaded = dt.gfunction.load_g_functions(path, mmap_mode)
+                self.assertEqual(len(loaded), len(g_functions))
+                for g_function, g_function_loaded in zip(g_functions, loaded):
+                    self.assertEqual(g_function.B, g_function_loaded.B)
+                    self.assertEqual(g_function.r_b_values,
+                                     g_function_loaded.r_b_values)
+                    self.assertEqual(g_function.D_values,
+                                     g_function_loaded.D_values)
+                    self.assertEqual(list(g_function.g_lts.keys()),
+                                     list(g_function_loaded.g_lts.keys()))
+                    for H in g_function.g_lts:
+                        self.assertTrue(np.array_equal(
+                            g_function.g_lts[H], g_function_loaded.g_lts[H]))
+                    self.assertTrue(np.array_equal(
+                        g_function.log_time, g_function_loaded.log_time))
+                    self.assertTrue(np.array_equal(
+                        g_function.bore_locations,
+                        g_function_loaded.bore_locations))
+                    # The loaded g-functions are interpolated the same
+                    g, _, _, _ = g_function.g_function_interpolation(
+                        self.B / 150.)
+                    g_loaded, _, _, _ = \
+                        g_function_loaded.g_function_interpolation(
+                            self.B / 150.)
+                    self.assertEqual(g, g_loaded)
+                self.assertIsInstance(loaded[0].g_lts[24.], np.ndarray)
+            del loaded
+
+            # A single GFunction
+            self.g_function.save(path)
+            g_function = dt.gfunction.GFunction.load(path)
+            self.assertEqual(list(g_function.g_lts.keys()),
+                             list(self.g_function.g_lts.keys()))
+
+    def test_symmetry_groups(self):
+        # A 4x4 square has 3 kinds of boreholes: corner, edge and interior
+        groups = dt.coordinates.symmetry_groups(
+            dt.coordinates.rectangle(4, 4, 5., 5.))
+        self.assertEqual(max(groups) + 1, 3)
+        # A 4x3 rectangle has no diagonal mirrors
+        groups = dt.coordinates.symmetry_groups(
+            dt.coordinates.rectangle(4, 3, 5., 6.))
+        self.assertEqual(max(groups) + 1, 4)
+        self.assertEqual(groups[0], groups[-1])
+        # The L-shape is only mirrored about its diagonal
+        groups = dt.coordinates.symmetry_groups(
+            dt.coordinates.L_shape(4, 4, 5., 5.))
+        self.assertEqual(max(groups) + 1, 4)
+
+    @staticmethod
+    def g_function_inputs():
+        r_out = 26.67 / 1000. / 2.  # Pipe outer radius (m)
+        r_in = 21.6 / 1000. / 2.  # Pipe inner radius (m)
+        s = 32.3 / 1000.  # Inner-tube to inner-tube Shank spacing (m)
+        pos = plat.media.Pipe.place_pipes(s, r_out, 1)
+        pipe = plat.media.Pipe(pos, r_in, r_out, s, 1.0e-6, 0.4, 1542. * 1000.)
+        soil = plat.media.Soil(2.0, 2343.493 * 1000., 18.3)
+        grout = plat.media.Grout(1.0, 3901. * 1000.)
+        fluid = gt.media.Fluid(mixer='MEG', percent=0.)
+        m_flow_borehole = 0.2 / 1000. * fluid.rho
+
+        H = 96.
+        borehole = gt.boreholes.Borehole(H, 2., 0.075, 0., 0.)
+        ts = H ** 2 / (9. * soil.k / soil.rhoCp)
+        time_values = np.exp(dt.utilities.Eskilson_log_times()) * ts
+
+        return m_flow_borehole, plat.borehole_heat_exchangers.SingleUTube, \
+            time_values, borehole, fluid, pipe, grout, soil
+
+    def test_symmetric_solver(self):
+        m_flow_borehole, bhe_object, time_values, borehole, fluid, pipe, \
+            grout, soil = self.g_function_inputs()
+        coordinates = dt.coordinates.rectangle(5, 4, 5., 5.)
+
+        # Solving for one borehole per symmetry group gives the g-function of
+        # the full field
+        for boundary in ['UBWT', 'MIFT']:
+            g = {}
+            for solver in ['similarities', 'symmetric']:
+                g[solver] = dt.gfunction.calculate_g_function(
+                    m_flow_borehole, bhe_object, time_values, coordinates,
+                    borehole, fluid, pipe, grout, soil, solver=solver,
+                    boundary=boundary).gFunc
+            self.assertTrue(
+                np.allclose(g['symmetric'], g['similarities'], rtol=1.0e-10))
+
+    def test_response_factor_reuse(self):
+        m_flow_borehole, bhe_object, time_values, borehole, fluid, pipe, \
+            grout, soil = self.g_function_inputs()
+        coordinates_domain = dt.domains.square_and_near_square(3, 5, 5.)
+        response_factors = dt.gfunction.ResponseFactorCache()
+
+        for solver in ['equivalent', 'symmetric']:
+            for coordinates in coordinates_domain[:3]:
+                g = {}
+                for reuse in [None, response_factors]:
+                    g[reuse] = dt.gfunction.calculate_g_function(
+                        m_flow_borehole, bhe_object, time_values,
+                        coordinates, borehole, fluid, pipe, grout, soil,
+                        solver=solver, response_factors=reuse).gFunc
+                self.assertTrue(np.allclose(
+                    g[response_factors], g[None], rtol=1.0e-10))
+        # Only the distances new to each field are evaluated
+        self.assertGreater(response_factors.hits, response_factors.misses)
+
+    def test_solver_fallback(self):
+        m_flow_borehole, bhe_object, time_values, borehole, fluid, pipe, \
+            grout, soil = self.g_function_inputs()
+        coordinates = dt.coordinates.rectangle(3, 2, 5., 5.)
+
+        g = {}
+        for solver in ['similarities', 'symmetric']:
+            g[solver] = dt.gfunction.calculate_g_function(
+                m_flow_borehole, bhe_object, time_values, coordinates,
+                borehole, fluid, pipe, grout, soil, solver=solver).gFunc
+
+        # Without the pygfunction internals, the stock solvers are used
+        found = dt.gfunction._SOLVER_INTERNALS_FOUND
+        dt.gfunction._SOLVER_INTERNALS_FOUND = False
+        try:
+            with self.assertWarns(UserWarning):
+                g_fallback = dt.gfunction.calculate_g_function(
+                    m_flow_borehole, bhe_object, time_values, coordinates,
+                    borehole, fluid, pipe, grout, soil, solver='symmetric',
+                    response_factors=dt.gfunction.ResponseFactorCache())
+        finally:
+            dt.gfunction._SOLVER_INTERNALS_FOUND = found
+        self.assertEqual(g_fallback.method, 'similarities')
+        self.assertTrue(np.array_equal(g_fallback.gFunc, g['similarities']))
+        self.assertTrue(
+            np.allclose(g_fallback.gFunc, g['symmetric'], rtol=1.0e-10))
@@ -0,0 +1,154 @@
+# agent
+# Saturday, October 17, 2026
+
+import unittest
+import os
+import tempfile
+
+import ghedt as dt
+import ghedt.peak_load_analysis_tool as plat
+import pygfunction as gt
+
+import numpy as np
+import pandas as pd
+
+TESTDATA_FILENAME = os.path.join(os.path.dirname(__file__),
+                                 'Atlanta_Office_Building_Loads.csv')
+
+
+class TestGFunctionCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp_dir.name, 'g_functions')
+
+        self.B = 5.  # Borehole spacing (m)
+        self.H_values = [48., 96.]
+        self.r_b_values = [0.075] * len(self.H_values)
+        self.D_values = [2.] * len(self.H_values)
+        self.coordinates = dt.coordinates.rectangle(3, 2, self.B, self.B)
+        self.log_time = dt.utilities.Eskilson_log_times()
+
+        r_out = 26.67 / 1000. / 2.  # Pipe outer radius (m)
+        r_in = 21.6 / 1000. / 2.  # Pipe inner radius (m)
+        s = 32.3 / 1000.  # Inner-tube to inner-tube Shank spacing (m)
+        pos = plat.media.Pipe.place_pipes(s, r_out, 1)
+        self.pipe = \
+            plat.media.Pipe(pos, r_in, r_out, s, 1.0e-6, 0.4, 1542. * 1000.)
+        self.SingleUTube = plat.borehole_heat_exchangers.SingleUTube
+        self.soil = plat.media.Soil(2.0, 2343.493 * 1000., 18.3)
+        self.grout = plat.media.Grout(1.0, 3901. * 1000.)
+        self.fluid = gt.media.Fluid(mixer='MEG', percent=0.)
+        self.m_flow_borehole = 0.2 / 1000. * self.fluid.rho
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def compute_live_g_function(self, cache, soil=None, n_workers=1):
+        if soil is None:
+            soil = self.soil
+        return dt.gfunction.compute_live_g_function(
+            self.B, self.H_values, self.r_b_values, self.D_values,
+            self.m_flow_borehole, self.SingleUTube, self.log_time,
+            self.coordinates, self.fluid, self.pipe, self.grout, soil,
+            cache=cache, n_workers=n_workers)
+
+    def test_cached_g_functions(self):
+        cache = dt.gfunction_cache.GFunctionCache(self.directory)
+
+        g_function = self.compute_live_g_function(cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+        self.assertEqual(len(cache.entries()), 2)
+
+        # A new cache object reads the g-functions stored on disk
+        cache = dt.gfunction_cache.GFunctionCache(self.directory)
+        g_function_cached = self.compute_live_g_function(cache)
+        self.assertEqual((cache.hits, cache.misses), (2, 0))
+        self.assertEqual(g_function.g_lts, g_function_cached.g_lts)
+
+        # Different inputs do not use the stored g-functions
+        soil = plat.media.Soil(2.5, 2343.493 * 1000., 18.3)
+        self.compute_live_g_function(cache, soil=soil)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_parallel_g_functions(self):
+        g_function = self.compute_live_g_function(None)
+        # The heights computed in separate processes are the same
+        g_function_parallel = self.compute_live_g_function(None, n_workers=2)
+        self.assertEqual(g_function.g_lts, g_function_parallel.g_lts)
+
+        # Only the heights missing from the cache are computed
+        cache = dt.gfunction_cache.GFunctionCache(self.directory)
+        cache.set(cache.key(
+            self.coordinates, self.H_values[0], self.r_b_values[0],
+            self.D_values[0], self.m_flow_borehole, self.SingleUTube,
+            self.log_time, self.fluid, self.pipe, self.grout, self.soil, 8,
+            'unequal', 'equivalent', 'MIFT', None),
+            g_function.g_lts[self.H_values[0]])
+        g_function_parallel = self.compute_live_g_function(cache, n_workers=2)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(g_function.g_lts, g_function_parallel.g_lts)
+
+    def test_eviction(self):
+        g_values = np.linspace(0., 10., 27)
+        cache = dt.gfunction_cache.GFunctionCache(self.directory)
+        cache.set('a', g_values)
+        entry_size = cache.size()
+
+        # Only two g-functions fit in the cache, the least recently used one
+        # is removed
+        cache.max_size = 2 * entry_size
+        cache.set('b', g_values)
+        os.utime(cache.path('a'), (0., 0.))
+        os.utime(cache.path('b'), (1., 1.))
+        self.assertIsNotNone(cache.get('a'))
+        cache.set('c', g_values)
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertTrue(np.array_equal(cache.get('c'), g_values))
+        self.assertLessEqual(cache.size(), cache.max_size)
+
+    def test_lru_g_functions(self):
+        g_values = np.linspace(0., 10., 27)
+        backing = dt.gfunction_cache.GFunctionCache(self.directory)
+        backing.set('a', g_values)
+
+        cache = dt.gfunction_cache.LRUGFunctionCache(maxsize=2,
+                                                     backing=backing)
+        # Loaded from the persistent cache, and then from memory
+        self.assertTrue(np.array_equal(cache.get('a'), g_values))
+        self.assertTrue(np.array_equal(cache.get('a'), g_values))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual((backing.hits, backing.misses), (1, 0))
+
+        # The least recently used g-function is removed from memory, but
+        # remains in the persistent cache
+        cache.set('b', g_values)
+        cache.get('a')
+        cache.set('c', g_values)
+        self.assertEqual(list(cache.g_values.keys()), ['a', 'c'])
+        self.assertIsNotNone(backing.get('b'))
+
+        # Without a persistent cache, g-functions not in memory are missing
+        cache = dt.gfunction_cache.LRUGFunctionCache()
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+    def test_search_reuses_g_functions(self):
+        sim_params = plat.media.SimulationParameters(
+            1, 20 * 12, 35., 5., 135., 60.)
+        # Scale the loads of the office building down to a few boreholes
+        hourly_extraction: dict = \
+            pd.read_csv(TESTDATA_FILENAME).to_dict('list')
+        hourly_extraction_ground_loads: list = \
+            [q / 20. for q in
+             hourly_extraction[list(hourly_extraction.keys())[0]]]
+        borehole = gt.boreholes.Borehole(96., 2., 0.075, x=0., y=0.)
+
+        bisection_search = dt.search_routines.Bisection1D(
+            dt.domains.square_and_near_square(1, 6, self.B), 0.2, borehole,
+            self.SingleUTube, self.fluid, self.pipe, self.grout, self.soil,
+            sim_params, hourly_extraction_ground_loads)
+        # The search revisits fields whose g-functions are kept in memory
+        self.assertGreater(bisection_search.g_function_cache.hits, 0)
@@ -0,0 +1,122 @@
+# agent
+# Saturday, October 17, 2026
+
+import unittest
+import os
+import tempfile
+
+import ghedt as dt
+import ghedt.peak_load_analysis_tool as plat
+import pygfunction as gt
+
+import pandas as pd
+
+TESTDATA_FILENAME = os.path.join(os.path.dirname(__file__),
+                                 'Atlanta_Office_Building_Loads.csv')
+
+
+class TestGFunctionLibrary(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'library.npz')
+
+        self.B = 5.  # Borehole spacing (m)
+        self.borehole = gt.boreholes.Borehole(96., 2., 0.075, x=0., y=0.)
+        self.H_values = [24., 48., 96., 192., 384.]
+        self.coordinates_domain = \
+            dt.domains.square_and_near_square(1, 2, self.B)
+
+        r_out = 26.67 / 1000. / 2.  # Pipe outer radius (m)
+        r_in = 21.6 / 1000. / 2.  # Pipe inner radius (m)
+        s = 32.3 / 1000.  # Inner-tube to inner-tube Shank spacing (m)
+        pos = plat.media.Pipe.place_pipes(s, r_out, 1)
+        self.pipe = \
+            plat.media.Pipe(pos, r_in, r_out, s, 1.0e-6, 0.4, 1542. * 1000.)
+        self.SingleUTube = plat.borehole_heat_exchangers.SingleUTube
+        self.soil = plat.media.Soil(2.0, 2343.493 * 1000., 18.3)
+        self.grout = plat.media.Grout(1.0, 3901. * 1000.)
+        self.fluid = gt.media.Fluid(mixer='MEG', percent=0.)
+        self.V_flow_borehole = 0.2  # (L/s)
+        self.m_flow_borehole = self.V_flow_borehole / 1000. * self.fluid.rho
+
+        self.sim_params = plat.media.SimulationParameters(
+            1, 20 * 12, 35., 5., 384., 24.)
+        # Scale the loads of the office building down to a few boreholes
+        hourly_extraction: dict = \
+            pd.read_csv(TESTDATA_FILENAME).to_dict('list')
+        self.hourly_extraction_ground_loads: list = \
+            [q / 40. for q in
+             hourly_extraction[list(hourly_extraction.keys())[0]]]
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def build(self, coordinates_domain):
+        return dt.gfunction_library.GFunctionLibrary.build(
+            self.path, coordinates_domain, self.H_values,
+            self.V_flow_borehole, self.borehole, self.SingleUTube, self.fluid,
+            self.pipe, self.grout, self.soil)
+
+    def test_library(self):
+        library = self.build(self.coordinates_domain[0:2])
+        coordinates = self.coordinates_domain[1]
+
+        # The library holds the g-functions of the field at each height
+        g_function = library.g_function(
+            self.B, coordinates, self.borehole, self.m_flow_borehole,
+            self.SingleUTube, self.fluid, self.pipe, self.grout, self.soil)
+        g_function_live = dt.gfunction.compute_live_g_function(
+            self.B, self.H_values, [0.075] * 5, [2.] * 5,
+            self.m_flow_borehole, self.SingleUTube,
+            dt.utilities.Eskilson_log_times(), coordinates, self.fluid,
+            self.pipe, self.grout, self.soil)
+        self.assertEqual(g_function.g_lts, g_function_live.g_lts)
+
+        # Fields that are not in the library (or computed with other inputs)
+        # are not found
+        self.assertIsNone(library.g_function(
+            self.B, self.coordinates_domain[2], self.borehole,
+            self.m_flow_borehole, self.SingleUTube, self.fluid, self.pipe,
+            self.grout, self.soil))
+        self.assertIsNone(library.g_function(
+            self.B, coordinates, self.borehole, 2. * self.m_flow_borehole,
+            self.SingleUTube, self.fluid, self.pipe, self.grout, self.soil))
+        # The g-functions on other ln(t/ts) values are not found
+        self.assertIsNone(library.g_function(
+            self.B, coordinates, self.borehole, self.m_flow_borehole,
+            self.SingleUTube, self.fluid, self.pipe, self.grout, self.soil,
+            log_time=dt.utilities.Eskilson_log_times()[1:]))
+        self.assertEqual((library.hits, library.misses), (1, 3))
+
+        # Fields are added to an existing library (which the library that is
+        # in use does not keep open), and a nested domain can be given
+        library = self.build([self.coordinates_domain[1:3],
+                              self.coordinates_domain[3:]])
+        self.assertEqual(
+            len([key for key in library.keys if key.startswith('field_')]),
+            len(self.coordinates_domain))
+
+    def test_search_with_library(self):
+        library = self.build(self.coordinates_domain)
+
+        def bisection_search(library):
+            return dt.search_routines.Bisection1D(
+                self.coordinates_domain, self.V_flow_borehole, self.borehole,
+                self.SingleUTube, self.fluid, self.pipe, self.grout,
+                self.soil, self.sim_params,
+                self.hourly_extraction_ground_loads, search=False,
+                library=library)
+
+        search_live = bisection_search(None)
+        search_library = bisection_search(library)
+        coordinates = self.coordinates_domain[-1]
+
+        # At a height of the library, the g-function is the same as the live
+        # g-function, and is interpolated between the heights
+        for H, places in [(96., 8), (150., 1)]:
+            self.assertAlmostEqual(
+                search_live.calculate_excess(coordinates, H),
+                search_library.calculate_excess(coordinates, H),
+                places=places)
+        self.assertEqual(library.misses, 0)
@@ -0,0 +1,118 @@
+# agent
+# Saturday, October 17, 2026
+
+import unittest
+import os
+
+import ghedt as dt
+import ghedt.peak_load_analysis_tool as plat
+import pygfunction as gt
+
+import numpy as np
+import pandas as pd
+
+TESTDATA_FILENAME = os.path.join(os.path.dirname(__file__),
+                                 'Atlanta_Office_Building_Loads.csv')
+
+
+class TestGFunctionSurrogate(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.B = 5.  # Borehole spacing (m)
+        self.H = 96.  # Borehole length (m)
+        self.borehole = gt.boreholes.Borehole(self.H, 2., 0.075, x=0., y=0.)
+        # The fields of a property that is not rectangular
+        property_boundary = [[0., 0.], [60., 0.], [60., 30.], [30., 45.],
+                             [0., 45.], [0., 0.]]
+        self.coordinates_domain_nested = \
+            dt.domains.polygonal_land_constraint(
+                property_boundary, self.B, 15., 15.)
+
+        r_out = 26.67 / 1000. / 2.  # Pipe outer radius (m)
+        r_in = 21.6 / 1000. / 2.  # Pipe inner radius (m)
+        s = 32.3 / 1000.  # Inner-tube to inner-tube Shank spacing (m)
+        pos = plat.media.Pipe.place_pipes(s, r_out, 1)
+        self.pipe = \
+            plat.media.Pipe(pos, r_in, r_out, s, 1.0e-6, 0.4, 1542. * 1000.)
+        self.SingleUTube = plat.borehole_heat_exchangers.SingleUTube
+        self.soil = plat.media.Soil(2.0, 2343.493 * 1000., 18.3)
+        self.grout = plat.media.Grout(1.0, 3901. * 1000.)
+        self.fluid = gt.media.Fluid(mixer='MEG', percent=0.)
+        self.V_flow_borehole = 0.2  # (L/s)
+        self.m_flow_borehole = self.V_flow_borehole / 1000. * self.fluid.rho
+
+        self.sim_params = plat.media.SimulationParameters(
+            1, 20 * 12, 35., 5., 135., 60.)
+        # Scale the loads of the office building down to the property
+        hourly_extraction: dict = \
+            pd.read_csv(TESTDATA_FILENAME).to_dict('list')
+        self.hourly_extraction_ground_loads: list = \
+            [q / 4. for q in
+             hourly_extraction[list(hourly_extraction.keys())[0]]]
+
+    def compute_live_g_function(self, coordinates):
+        return dt.gfunction.compute_live_g_function(
+            self.B, [self.H], [0.075], [2.], self.m_flow_borehole,
+            self.SingleUTube, dt.utilities.Eskilson_log_times(), coordinates,
+            self.fluid, self.pipe, self.grout, self.soil)
+
+    def train(self):
+        # Train the surrogate with the fields of two of the inner domains
+        fields = self.coordinates_domain_nested[2][::2] + \
+            self.coordinates_domain_nested[5][::2]
+        return dt.gfunction_surrogate.GFunctionSurrogate(
+            [self.compute_live_g_function(coordinates)
+             for coordinates in fields])
+
+    def test_surrogate(self):
+        surrogate = self.train()
+
+        # The g-functions of fields the surrogate was not trained with are
+        # estimated within a few percent
+        for coordinates in self.coordinates_domain_nested[0][4::4]:
+            g_values = \
+                self.compute_live_g_function(coordinates).g_lts[self.H]
+            g_surrogate = surrogate.predict(coordinates, self.H)
+            self.assertLess(np.abs(g_surrogate / g_values - 1.).max(), 0.15)
+        self.assertEqual(surrogate.error.shape, surrogate.log_time.shape)
+
+        # At least as many g-functions as regression terms are needed
+        with self.assertRaises(ValueError):
+            dt.gfunction_surrogate.GFunctionSurrogate(
+                [self.compute_live_g_function(
+                    self.coordinates_domain_nested[0][1])]).fit()
+
+    def test_search_with_surrogate(self):
+        surrogate = self.train()
+        n_samples = len(surrogate.Y)
+
+        def bisection_search(fidelity, surrogate=None):
+            return dt.search_routines.Bisection1D(
+                self.coordinates_domain_nested[0], self.V_flow_borehole,
+                self.borehole, self.SingleUTube, self.fluid, self.pipe,
+                self.grout, self.soil, self.sim_params,
+                self.hourly_extraction_ground_loads, fidelity=fidelity,
+                surrogate=surrogate)
+
+        search_high = bisection_search('high')
+        search_surrogate = bisection_search('surrogate', surrogate)
+
+        # The fields are ranked with the surrogate, and the selection is
+        # confirmed with live g-functions
+        self.assertEqual(search_high.selection_key,
+                         search_surrogate.selection_key)
+        self.assertGreater(search_surrogate.evaluations['surrogate'], 0)
+        self.assertLess(search_surrogate.evaluations['high'],
+                        search_high.evaluations['high'])
+        self.assertIn(('domain', search_surrogate.selection_key),
+                      search_surrogate.screening_errors)
+        self.assertIn('surrogate', search_surrogate.evaluation_report())
+        # The live g-functions of the searches are added to the surrogate
+        self.assertGreater(len(surrogate.Y), n_samples)
+
+        with self.assertRaises(ValueError):
+            dt.search_routines.Bisection1D(
+                self.coordinates_domain_nested[0], self.V_flow_borehole,
+                self.borehole, self.SingleUTube, self.fluid, self.pipe,
+                self.grout, self.soil, self.sim_params,
+                self.hourly_extraction_ground_loads, fidelity='surrogate')
@@ -2,12 +2,15 @@
 # Monday, October 11, 2021
 
 import unittest
+from unittest import mock
 import os
+import tempfile
 
 import ghedt as dt
 import ghedt.peak_load_analysis_tool as plat
 import pygfunction as gt
 
+import numpy as np
 import pandas as pd
 
 TESTDATA_FILENAME = os.path.join(os.path.dirname(__file__),
@@ -169,6 +172,85 @@ class TestGHE(unittest.TestCase):
 
         self.assertAlmostEqual(ghe.bhe.b.H, 130.13510780396268, places=2)
 
+    def test_early_exit(self):
+
+        # Define a borehole
+        borehole = gt.boreholes.Borehole(self.H, self.D, self.r_b, x=0., y=0.)
+
+        # Initialize GHE object
+        g_function = dt.gfunction.compute_live_g_function(
+            self.B, self.H_values, self.r_b_values, self.D_values,
+            self.m_flow_borehole, self.SingleUTube,
+            self.log_time, self.coordinates, self.fluid, self.pipe_s,
+            self.grout, self.soil)
+
+        # Initialize the GHE object
+        ghe = dt.ground_heat_exchangers.GHE(
+            self.V_flow_system, self.B, self.SingleUTube, self.fluid,
+            borehole, self.pipe_s, self.grout, self.soil,
+            g_function, self.sim_params, self.hourly_extraction_ground_loads)
+
+        # The maximum fluid temperature is exceeded, so the early exit
+        # simulation stops before the end of the simulation
+        ghe.simulate(method='hybrid')
+        n_steps = len(ghe.HPEFT)
+        max_HP_EFT, min_HP_EFT = ghe.simulate(method='hybrid', early_exit=True)
+        self.assertGreater(max_HP_EFT, self.sim_params.max_EFT_allowable)
+        self.assertLess(len(ghe.HPEFT), n_steps)
+        self.assertGreater(ghe.HPEFT[ghe.violation_step],
+                           self.sim_params.max_EFT_allowable)
+
+        # A deeper field stays within the allowable range, so the early exit
+        # simulation runs to the end and gives the same temperatures
+        ghe.bhe.b.H = 200.
+        max_HP_EFT, min_HP_EFT = ghe.simulate(method='hybrid')
+        HPEFT = ghe.HPEFT
+        self.assertLessEqual(max_HP_EFT, self.sim_params.max_EFT_allowable)
+        self.assertGreaterEqual(min_HP_EFT, self.sim_params.min_EFT_allowable)
+        self.assertEqual(
+            ghe.simulate(method='hybrid', early_exit=True),
+            (max_HP_EFT, min_HP_EFT))
+        self.assertIsNone(ghe.violation_step)
+        self.assertTrue(np.array_equal(ghe.HPEFT, HPEFT))
+
+    def test_saved_g_function(self):
+
+        # Initialize GHE object
+        g_function = dt.gfunction.compute_live_g_function(
+            self.B, self.H_values, self.r_b_values, self.D_values,
+            self.m_flow_borehole, self.SingleUTube,
+            self.log_time, self.coordinates, self.fluid, self.pipe_s,
+            self.grout, self.soil)
+
+        def initialize_ghe(g_function):
+            # Sizing changes the height of the borehole, so each ground heat
+            # exchanger has its own
+            borehole = gt.boreholes.Borehole(
+                self.H, self.D, self.r_b, x=0., y=0.)
+            return dt.ground_heat_exchangers.GHE(
+                self.V_flow_system, self.B, self.SingleUTube, self.fluid,
+                borehole, self.pipe_s, self.grout, self.soil, g_function,
+                self.sim_params, self.hourly_extraction_ground_loads)
+
+        ghe = initialize_ghe(g_function)
+        max_HP_EFT, min_HP_EFT = ghe.simulate(method='hybrid')
+
+        # The g-function loaded from a file (as numpy arrays, or memory
+        # mapped) gives the same ground heat exchanger simulation
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'g_function.npz')
+            g_function.save(path)
+            for mmap_mode in [None, 'r']:
+                g_function_loaded = dt.gfunction.GFunction.load(
+                    path, mmap_mode=mmap_mode)
+                ghe_loaded = initialize_ghe(g_function_loaded)
+                self.assertEqual(ghe_loaded.simulate(method='hybrid'),
+                                 (max_HP_EFT, min_HP_EFT))
+                ghe_loaded.size(method='hybrid')
+                self.assertAlmostEqual(ghe_loaded.bhe.b.H, 130.13510780396268,
+                                       places=2)
+                del g_function_loaded, ghe_loaded
+
     def test_double_u_tube(self):
 
         # Define a borehole
@@ -222,3 +304,452 @@ class TestGHE(unittest.TestCase):
         ghe.size(method='hybrid')
 
         self.assertAlmostEqual(ghe.bhe.b.H, 120.89971616555863, places=2)
+
+    def test_hourly_superposition(self):
+
+        # Define a borehole
+        borehole = gt.boreholes.Borehole(self.H, self.D, self.r_b, x=0., y=0.)
+
+        # Initialize GHE object
+        g_function = dt.gfunction.compute_live_g_function(
+            self.B, self.H_values, self.r_b_values, self.D_values,
+            self.m_flow_borehole, self.SingleUTube,
+            self.log_time, self.coordinates, self.fluid, self.pipe_s,
+            self.grout, self.soil)
+
+        # Simulate two years so that the direct superposition is quick
+        self.sim_params.end_month = 24
+
+        # Initialize the GHE object
+        ghe = dt.ground_heat_exchangers.GHE(
+            self.V_flow_system, self.B, self.SingleUTube, self.fluid,
+            borehole, self.pipe_s, self.grout, self.soil,
+            g_function, self.sim_params, self.hourly_extraction_ground_loads)
+
+        max_HP_EFT, min_HP_EFT = ghe.simulate(method='hourly')
+        max_HP_EFT_agg, min_HP_EFT_agg = ghe.simulate(
+            method='hourly', superposition='aggregated')
+
+        self.assertAlmostEqual(max_HP_EFT, max_HP_EFT_agg, delta=0.05)
+        self.assertAlmostEqual(min_HP_EFT, min_HP_EFT_agg, delta=0.05)
+
+        # The streamed simulation repeats the aggregated simulation
+        HPEFT_agg = ghe.HPEFT
+        HPEFT_chunks = []
+        for HPEFT_chunk in ghe.simulate_hourly_chunks(chunk_size=1000):
+            self.assertLessEqual(HPEFT_chunk.size, 1000)
+            HPEFT_chunks += HPEFT_chunk.tolist()
+        self.assertEqual(len(HPEFT_agg), len(HPEFT_chunks))
+        self.assertAlmostEqual(max(HPEFT_agg), max(HPEFT_chunks), places=8)
+        self.assertAlmostEqual(min(HPEFT_agg), min(HPEFT_chunks), places=8)
+
+        max_HP_EFT_fft, min_HP_EFT_fft = ghe.simulate(
+            method='hourly', superposition='fft')
+        self.assertAlmostEqual(max_HP_EFT, max_HP_EFT_fft, places=8)
+        self.assertAlmostEqual(min_HP_EFT, min_HP_EFT_fft, places=8)
+
+        # The response operator applies the same simulation to many loads
+        response = dt.ground_heat_exchangers.ResponseOperator(ghe)
+        loads = [self.hourly_extraction_ground_loads,
+                 [2. * q for q in self.hourly_extraction_ground_loads]]
+        max_HP_EFTs, min_HP_EFTs = response.extreme_temperatures(loads)
+        self.assertAlmostEqual(max_HP_EFT, max_HP_EFTs[0], places=8)
+        self.assertAlmostEqual(min_HP_EFT, min_HP_EFTs[0], places=8)
+        # The temperature change is linear in the load
+        Tg = self.soil.ugt
+        self.assertAlmostEqual(2. * (max_HP_EFT - Tg), max_HP_EFTs[1] - Tg,
+                               places=8)
+
+        with self.assertRaises(ValueError):
+            ghe.simulate(method='hybrid', superposition='fft')
+
+    def test_update_bhe(self):
+
+        # Define a borehole
+        borehole = gt.boreholes.Borehole(self.H, self.D, self.r_b, x=0., y=0.)
+
+        # Initialize GHE object
+        coordinates = dt.coordinates.rectangle(3, 3, self.B, self.B)
+        g_function = dt.gfunction.compute_live_g_function(
+            self.B, self.H_values, self.r_b_values, self.D_values,
+            self.m_flow_borehole, self.DoubleUTube,
+            self.log_time, coordinates, self.fluid, self.pipe_d,
+            self.grout, self.soil)
+
+        # Initialize the GHE object (the equivalent of a double U-tube is a
+        # new single U-tube)
+        ghe = dt.ground_heat_exchangers.GHE(
+            self.V_flow_system, self.B, self.DoubleUTube, self.fluid,
+            borehole, self.pipe_d, self.grout, self.soil,
+            g_function, self.sim_params, self.hourly_extraction_ground_loads)
+        bhe_eq = ghe.bhe_eq
+        radial_numerical = ghe.radial_numerical
+        g_sts = ghe.radial_numerical.g
+
+        # Nothing is recomputed when the inputs have not changed
+        ghe.update_bhe()
+        self.assertIs(ghe.bhe_eq, bhe_eq)
+        self.assertIs(ghe.radial_numerical, radial_numerical)
+        self.assertIs(ghe.radial_numerical.g, g_sts)
+
+        # The effective borehole resistance depends on the height, so the
+        # equivalent borehole heat exchanger and the short time step
+        # g-function are recomputed when only the height changes
+        ghe.bhe.b.H = 150.
+        ghe.update_bhe()
+        self.assertIsNot(ghe.bhe_eq, bhe_eq)
+        self.assertEqual(ghe.bhe_eq.b.H, 150.)
+        self.assertIsNot(ghe.radial_numerical.g, g_sts)
+        self.assertFalse(np.array_equal(ghe.radial_numerical.g, g_sts))
+        self.assertEqual(ghe.bhe_signature, ghe.compute_bhe_signature())
+
+    def test_simulate_many(self):
+
+        # Define a borehole
+        borehole = gt.boreholes.Borehole(self.H, self.D, self.r_b, x=0., y=0.)
+
+        # Initialize GHE object
+        g_function = dt.gfunction.compute_live_g_function(
+            self.B, self.H_values, self.r_b_values, self.D_values,
+            self.m_flow_borehole, self.SingleUTube,
+            self.log_time, self.coordinates, self.fluid, self.pipe_s,
+            self.grout, self.soil)
+
+        # Initialize the GHE object
+        ghe = dt.ground_heat_exchangers.GHE(
+            self.V_flow_system, self.B, self.SingleUTube, self.fluid,
+            borehole, self.pipe_s, self.grout, self.soil,
+            g_function, self.sim_params, self.hourly_extraction_ground_loads)
+
+        H_values = [80., 130., 200.]
+        bhe_eq = ghe.bhe_eq
+        T_excess = ghe.simulate_many(H_values, method='hybrid')
+
+        # The ground heat exchanger is not changed
+        self.assertEqual(ghe.bhe.b.H, self.H)
+        self.assertIs(ghe.bhe_eq, bhe_eq)
+        for i in range(len(H_values)):
+            ghe.bhe.b.H = H_values[i]
+            max_HP_EFT, min_HP_EFT = ghe.simulate(method='hybrid')
+            self.assertEqual(ghe.cost(max_HP_EFT, min_HP_EFT), T_excess[i])
+
+        # The root is bracketed by the minimum and maximum heights by default,
+        # and more bracketing heights find the same height
+        ghe.size(method='hybrid')
+        H = ghe.bhe.b.H
+        ghe.size(method='hybrid', n_bracket=5)
+        self.assertAlmostEqual(ghe.bhe.b.H, H, places=4)
+
+    def test_max_load_scale(self):
+
+        # Define a borehole
+        borehole = gt.boreholes.Borehole(self.H, self.D, self.r_b, x=0., y=0.)
+
+        # Initialize GHE object
+        g_function = dt.gfunction.compute_live_g_function(
+            self.B, self.H_values, self.r_b_values, self.D_values,
+            self.m_flow_borehole, self.SingleUTube,
+            self.log_time, self.coordinates, self.fluid, self.pipe_s,
+            self.grout, self.soil)
+
+        # Initialize the GHE object
+        ghe = dt.ground_heat_exchangers.GHE(
+            self.V_flow_system, self.B, self.SingleUTube, self.fluid,
+            borehole, self.pipe_s, self.grout, self.soil,
+            g_function, self.sim_params, self.hourly_extraction_ground_loads)
+
+        scale = ghe.max_load_scale(method='hybrid')
+
+        # The scaled loads bring the fluid temperature to the limit
+        scaled_loads = [scale * q for q in self.hourly_extraction_ground_loads]
+        ghe = dt.ground_heat_exchangers.GHE(
+            self.V_flow_system, self.B, self.SingleUTube, self.fluid,
+            borehole, self.pipe_s, self.grout, self.soil,
+            g_function, self.sim_params, scaled_loads)
+        max_HP_EFT, min_HP_EFT = ghe.simulate(method='hybrid')
+        T_excess = ghe.cost(max_HP_EFT, min_HP_EFT)
+
+        self.assertAlmostEqual(T_excess, 0., places=8)
+
+    def test_multi_year_loads(self):
+
+        # Define a borehole
+        borehole = gt.boreholes.Borehole(self.H, self.D, self.r_b, x=0., y=0.)
+
+        # Initialize GHE object
+        g_function = dt.gfunction.compute_live_g_function(
+            self.B, self.H_values, self.r_b_values, self.D_values,
+            self.m_flow_borehole, self.SingleUTube,
+            self.log_time, self.coordinates, self.fluid, self.pipe_s,
+            self.grout, self.soil)
+
+        def initialize_ghe(hourly_extraction_ground_loads):
+            return dt.ground_heat_exchangers.GHE(
+                self.V_flow_system, self.B, self.SingleUTube, self.fluid,
+                borehole, self.pipe_s, self.grout, self.soil, g_function,
+                self.sim_params, hourly_extraction_ground_loads)
+
+        # Two identical years of loads are the same as one repeated year
+        one_year = np.array(self.hourly_extraction_ground_loads)
+        ghe_one_year = initialize_ghe(self.hourly_extraction_ground_loads)
+        ghe_two_years = initialize_ghe(np.hstack((one_year, one_year)))
+        self.assertEqual(ghe_two_years.hybrid_load.n_years, 2)
+        for method, superposition in [('hybrid', 'direct'), ('hourly', 'fft')]:
+            self.assertEqual(
+                ghe_one_year.simulate(
+                    method=method, superposition=superposition),
+                ghe_two_years.simulate(
+                    method=method, superposition=superposition))
+
+        # Loads that grow in the second year, read from a memory mapped file
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'loads.npy')
+            np.save(path, np.hstack((one_year, 1.5 * one_year)))
+            loads = np.load(path, mmap_mode='r')
+            ghe = initialize_ghe(loads)
+
+            monthly_hl = ghe.hybrid_load.monthly_hl
+            self.assertAlmostEqual(monthly_hl[13], 1.5 * monthly_hl[1])
+            # The peak analysis has the months of both years
+            df = ghe.hybrid_load.create_dataframe_of_peak_analysis()
+            self.assertEqual(len(df), 24)
+            self.assertAlmostEqual(
+                df.loc[(2, 'January'), ('Total', 'extraction')],
+                monthly_hl[13])
+            max_HP_EFT, min_HP_EFT = ghe.simulate(
+                method='hourly', superposition='fft')
+            Q_dot, time_values = ghe._load_history(method='hourly')
+            self.assertTrue(
+                np.array_equal(Q_dot[8760:17520], -1.5 * one_year))
+            self.assertTrue(
+                np.array_equal(Q_dot[17520:26280], -1. * one_year))
+            del loads, ghe
+
+        self.assertGreater(max_HP_EFT, ghe_one_year.simulate(
+            method='hourly', superposition='fft')[0])
+
+    def test_radial_numerical(self):
+
+        # Define a borehole
+        borehole = gt.boreholes.Borehole(self.H, self.D, self.r_b, x=0., y=0.)
+
+        single_u_tube = self.SingleUTube(
+            self.m_flow_borehole, self.fluid, borehole, self.pipe_s,
+            self.grout, self.soil)
+        bhe_eq = plat.equivalance.compute_equivalent(single_u_tube)
+
+        radial_numerical = \
+            plat.radial_numerical_borehole.RadialNumericalBH(bhe_eq)
+        lntts, g = radial_numerical.calc_sts_g_functions(bhe_eq)
+
+        # The short time step g-function is marched with a time step of 2
+        # minutes until at least ln(t/ts) = -8.6
+        self.assertEqual(len(lntts), 1998)
+        self.assertAlmostEqual(lntts[-1], -8.600228647237316, places=10)
+        self.assertAlmostEqual(g[-1], 2.092386590800026, places=10)
+        self.assertAlmostEqual(float(radial_numerical.g_sts(-12.)),
+                               -0.06067160511004409, places=10)
+        self.assertAlmostEqual(float(radial_numerical.g_sts(-10.)),
+                               1.314863928790885, places=10)
+
+    def test_adaptive_sts_time_stepping(self):
+
+        # Define a borehole
+        borehole = gt.boreholes.Borehole(self.H, self.D, self.r_b, x=0., y=0.)
+
+        single_u_tube = self.SingleUTube(
+            self.m_flow_borehole, self.fluid, borehole, self.pipe_s,
+            self.grout, self.soil)
+        bhe_eq = plat.equivalance.compute_equivalent(single_u_tube)
+
+        radial_numerical = \
+            plat.radial_numerical_borehole.RadialNumericalBH(bhe_eq)
+        radial_numerical.calc_sts_g_functions(bhe_eq)
+        hours = np.arange(1., 49.) * 3600.
+        lntts_hours = np.log(hours / radial_numerical.t_s)
+        g_fixed = radial_numerical.g_sts(lntts_hours)
+
+        radial_numerical = plat.radial_numerical_borehole.RadialNumericalBH(
+            bhe_eq, time_stepping='adaptive')
+        lntts, g = radial_numerical.calc_sts_g_functions(bhe_eq)
+        g_adaptive = radial_numerical.g_sts(lntts_hours)
+
+        # The g-function is output on the multiples of 0.1 in ln(t/ts), and
+        # is within the time discretization error of the 2 minute time step
+        self.assertLess(len(lntts), 100)
+        self.assertTrue(np.allclose(lntts[1:], np.round(lntts[1:], 1)))
+        self.assertLess(np.abs(g_adaptive - g_fixed).max(), 2.0e-2)
+        self.assertLess(np.abs(g_adaptive - g_fixed)[12:].max(), 1.0e-3)
+
+        # The g-function converges with the tolerance
+        radial_numerical.calc_sts_g_functions(
+            bhe_eq, tolerance=1.0e-5, log_time_step=0.05)
+        self.assertLess(
+            np.abs(radial_numerical.g_sts(lntts_hours) - g_adaptive).max(),
+            1.0e-3)
+
+        with self.assertRaises(ValueError):
+            radial_numerical.calc_sts_g_functions(
+                bhe_eq, time_stepping='variable')
+
+        # The GHE can be simulated with the adaptive time stepping
+        g_function = dt.gfunction.compute_live_g_function(
+            self.B, self.H_values, self.r_b_values, self.D_values,
+            self.m_flow_borehole, self.SingleUTube,
+            self.log_time, self.coordinates, self.fluid, self.pipe_s,
+            self.grout, self.soil)
+        ghe = dt.ground_heat_exchangers.GHE(
+            self.V_flow_system, self.B, self.SingleUTube, self.fluid,
+            borehole, self.pipe_s, self.grout, self.soil,
+            g_function, self.sim_params, self.hourly_extraction_ground_loads,
+            sts_time_stepping='adaptive')
+        max_HP_EFT, min_HP_EFT = ghe.simulate(method='hybrid')
+        self.assertAlmostEqual(39.084419566119934, max_HP_EFT, places=2)
+        self.assertAlmostEqual(16.660966674440232, min_HP_EFT, places=1)
+
+    def test_log_radial_grid(self):
+
+        # Define a borehole
+        borehole = gt.boreholes.Borehole(self.H, self.D, self.r_b, x=0., y=0.)
+
+        single_u_tube = self.SingleUTube(
+            self.m_flow_borehole, self.fluid, borehole, self.pipe_s,
+            self.grout, self.soil)
+        bhe_eq = plat.equivalance.compute_equivalent(single_u_tube)
+
+        def sts_g_function(**kwargs):
+            radial_numerical = \
+                plat.radial_numerical_borehole.RadialNumericalBH(
+                    bhe_eq, **kwargs)
+            radial_numerical.calc_sts_g_functions(bhe_eq)
+            hours = np.arange(1., 49.) * 3600.
+            return radial_numerical.g_sts(
+                np.log(hours / radial_numerical.t_s)), \
+                radial_numerical.num_cells
+
+        g_uniform, num_cells_uniform = sts_g_function()
+        g_log, num_cells_log = sts_g_function(grid='log')
+
+        # The log spaced grid has 5 times fewer cells, and is within the
+        # discretization error of the uniform grid
+        self.assertEqual(num_cells_uniform, 535)
+        self.assertLessEqual(5 * num_cells_log, num_cells_uniform)
+        self.assertLess(np.abs(g_log - g_uniform).max(), 2.0e-3)
+
+        # The log spaced grid converges with the number of cells, and the
+        # far field radius is far enough to not affect the g-function
+        g_fine, _ = sts_g_function(grid='log', num_grout_cells=32,
+                                   num_soil_cells=160)
+        self.assertLess(np.abs(g_fine - g_uniform).max(), 2.0e-3)
+        g_far, _ = sts_g_function(grid='log', far_field_radius=20.)
+        self.assertLess(np.abs(g_far - g_log).max(), 1.0e-3)
+
+        with self.assertRaises(ValueError):
+            sts_g_function(grid='geometric')
+
+    def test_sts_cache(self):
+
+        def sts_g_function(H, cache, **kwargs):
+            borehole = gt.boreholes.Borehole(H, self.D, self.r_b, x=0., y=0.)
+            single_u_tube = self.SingleUTube(
+                self.m_flow_borehole, self.fluid, borehole, self.pipe_s,
+                self.grout, self.soil)
+            bhe_eq = plat.equivalance.compute_equivalent(single_u_tube)
+            radial_numerical = \
+                plat.radial_numerical_borehole.RadialNumericalBH(
+                    bhe_eq, cache=cache, **kwargs)
+            return radial_numerical.calc_sts_g_functions(bhe_eq)
+
+        cache = plat.radial_numerical_borehole.STSCache()
+        for H in [self.H, 200., self.H]:
+            lntts, g = sts_g_function(H, cache)
+            lntts_ref, g_ref = sts_g_function(H, None)
+            # The g-function from the cache is the one that is computed
+            self.assertTrue(np.array_equal(lntts, lntts_ref))
+            self.assertTrue(np.array_equal(g, g_ref))
+        # The second g-function at the same height is found in the cache
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        # The g-functions computed with another time stepping or grid are
+        # kept separately
+        lntts, g = sts_g_function(self.H, cache, time_stepping='adaptive')
+        self.assertFalse(np.array_equal(g, g_ref[:len(g)]))
+        sts_g_function(self.H, cache, grid='log')
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+
+        # Only the most recently used g-functions are kept
+        cache.maxsize = 2
+        sts_g_function(300., cache)
+        self.assertEqual(len(cache.g_values), 2)
+        cache.clear()
+        self.assertEqual(len(cache.g_values), 0)
+
+    def test_batch_sts_g_functions(self):
+        borehole = gt.boreholes.Borehole(self.H, self.D, self.r_b, x=0., y=0.)
+        # The grout and pipe options of a screening study
+        bhe_eqs = []
+        for k_g in [0.8, 1.4, 2.0]:
+            grout = plat.media.Grout(k_g, self.grout.rhoCp)
+            for bhe_object, pipe in [(self.SingleUTube, self.pipe_s),
+                                     (self.DoubleUTube, self.pipe_d),
+                                     (self.CoaxialTube, self.pipe_c)]:
+                bhe = bhe_object(self.m_flow_borehole, self.fluid, borehole,
+                                 pipe, grout, self.soil)
+                bhe_eqs.append(plat.equivalance.compute_equivalent(bhe))
+
+        for time_stepping in ['fixed', 'adaptive']:
+            radial_numerical_bhs = [
+                plat.radial_numerical_borehole.RadialNumericalBH(
+                    bhe_eq, time_stepping=time_stepping, cache=None)
+                for bhe_eq in bhe_eqs]
+            sts_g_functions = \
+                plat.radial_numerical_borehole.calc_sts_g_functions_batch(
+                    radial_numerical_bhs, bhe_eqs)
+            for radial_numerical, bhe_eq, (lntts, g) in \
+                    zip(radial_numerical_bhs, bhe_eqs, sts_g_functions):
+                self.assertIs(radial_numerical.g, g)
+                lntts_ref, g_ref = \
+                    plat.radial_numerical_borehole.RadialNumericalBH(
+                        bhe_eq, time_stepping=time_stepping,
+                        cache=None).calc_sts_g_functions(bhe_eq)
+                self.assertTrue(np.array_equal(lntts, lntts_ref))
+                if time_stepping == 'fixed':
+                    # The g-functions are the same as those computed one at a
+                    # time
+                    self.assertTrue(np.array_equal(g, g_ref))
+                else:
+                    # The time steps are shared, and set by the largest error
+                    self.assertLess(np.abs(g - g_ref).max(), 1.0e-3)
+
+        # The g-functions computed in the batch are stored in the cache, and
+        # those found in the cache are not computed again
+        cache = plat.radial_numerical_borehole.STSCache()
+        radial_numerical_bhs = [
+            plat.radial_numerical_borehole.RadialNumericalBH(
+                bhe_eq, cache=cache) for bhe_eq in bhe_eqs[:2]]
+        plat.radial_numerical_borehole.calc_sts_g_functions_batch(
+            radial_numerical_bhs[:1], bhe_eqs[:1])
+        plat.radial_numerical_borehole.calc_sts_g_functions_batch(
+            radial_numerical_bhs, bhe_eqs[:2])
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        # The borehole heat exchangers with the same inputs have the same
+        # g-function, which is computed once
+        cache.clear()
+        radial_numerical_bhs = [
+            plat.radial_numerical_borehole.RadialNumericalBH(
+                bhe_eq, cache=cache) for bhe_eq in bhe_eqs[:2] + bhe_eqs[:1]]
+        radial = plat.radial_numerical_borehole
+        with mock.patch.object(radial, 'march_batch',
+                               wraps=radial.march_batch) as march_batch:
+            sts_g_functions = radial.calc_sts_g_functions_batch(
+                radial_numerical_bhs, bhe_eqs[:2] + bhe_eqs[:1])
+        self.assertEqual(len(march_batch.call_args[0][0]), 2)
+        self.assertEqual(len(cache.g_values), 2)
+        self.assertTrue(
+            np.array_equal(sts_g_functions[2][1], sts_g_functions[0][1]))
+        self.assertIsNot(sts_g_functions[2][1], sts_g_functions[0][1])
+
+        with self.assertRaises(ValueError):
+            plat.radial_numerical_borehole.calc_sts_g_functions_batch(
+                radial_numerical_bhs, bhe_eqs)
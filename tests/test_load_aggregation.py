@@ -0,0 +1,84 @@
+# agent
+# Saturday, October 17, 2026
+
+import unittest
+
+import numpy as np
+
+import ghedt as dt
+
+
+class TestLoadAggregation(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # A synthetic load history and response
+        rng = np.random.default_rng(0)
+        self.n_steps = 500
+        self.q = rng.normal(size=self.n_steps)
+        t = np.arange(1, self.n_steps + 1, dtype=np.double)
+        self.response = np.log(1. + t) + 0.1 * np.sqrt(t)
+
+    def direct_superposition(self):
+        q_dt = np.diff(self.q, prepend=0.)
+        delta_T = np.zeros(self.n_steps)
+        for i in range(self.n_steps):
+            delta_T[i] = q_dt[0:i+1].dot(self.response[i::-1])
+        return delta_T
+
+    def test_cell_widths(self):
+        widths = dt.load_aggregation.cell_widths(100, cells_per_level=2)
+        self.assertEqual(widths.sum(), 100)
+        self.assertListEqual(widths[0:6].tolist(), [1, 1, 2, 2, 4, 4])
+
+        widths = dt.load_aggregation.cell_widths(
+            8760, cells_per_level=3, block_sizes=[1, 24, 168])
+        self.assertEqual(widths.sum(), 8760)
+        self.assertListEqual(widths[0:7].tolist(), [1, 1, 1, 24, 24, 24, 168])
+
+        with self.assertRaises(ValueError):
+            dt.load_aggregation.cell_widths(100, block_sizes=[24, 168])
+
+    def test_unit_widths_are_exact(self):
+        # When every cell is one time step wide, the aggregation is the direct
+        # temporal superposition
+        aggregation = dt.load_aggregation.MultiLevelAggregation(
+            self.n_steps, cells_per_level=self.n_steps)
+        tau = aggregation.get_times_for_simulation()
+        aggregation.initialize(self.response[tau - 1])
+        delta_T = aggregation.simulate(self.q)
+
+        self.assertTrue(np.allclose(delta_T, self.direct_superposition(),
+                                    rtol=1.0e-12, atol=1.0e-12))
+
+    def test_aggregated_accuracy(self):
+        aggregation = dt.load_aggregation.MultiLevelAggregation(
+            self.n_steps, cells_per_level=5)
+        tau = aggregation.get_times_for_simulation()
+        aggregation.initialize(self.response[tau - 1])
+        delta_T = aggregation.simulate(self.q)
+
+        self.assertLess(aggregation.widths.size, self.n_steps / 10)
+        error = np.abs(delta_T - self.direct_superposition()).max()
+        self.assertLess(error, 0.05 * np.abs(delta_T).max())
+
+    def test_repeated_load(self):
+        period = 24
+        loads = dt.load_aggregation.RepeatedLoad(self.q[0:period])
+        n_steps = 10 * period + 5
+        q = np.tile(self.q[0:period], 11)[0:n_steps]
+        j = np.arange(n_steps + 1)
+
+        self.assertTrue(np.allclose(loads.load(j[0:n_steps]), q))
+        self.assertTrue(np.allclose(loads.cumulative_load(j),
+                                    np.hstack((0., np.cumsum(q)))))
+
+        # The streamed simulation matches the simulation of the whole history
+        aggregation = dt.load_aggregation.MultiLevelAggregation(n_steps)
+        tau = aggregation.get_times_for_simulation()
+        aggregation.initialize(self.response[tau - 1])
+        delta_T = aggregation.simulate(q)
+        delta_T_chunks = np.hstack(
+            [aggregation.simulate_cumulative(loads.cumulative_load, a,
+                                             min(a + 50, n_steps))
+             for a in range(0, n_steps, 50)])
+        self.assertTrue(np.allclose(delta_T, delta_T_chunks))